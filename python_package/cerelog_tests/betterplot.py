@@ -1,8 +1,17 @@
+import logging
+import threading
 import time
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError
+from brainflow.board_shim import (BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError,
+                                  BrainFlowPresets, BoardControllerDLL)
+from brainflow.exit_codes import BrainFlowExitCodes
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # --- Configuration ---
 BOARD_ID = BoardIds.CERELOG_X8_BOARD
@@ -10,19 +19,246 @@ SECONDS_TO_DISPLAY = 10
 UPDATE_INTERVAL_MS = 200
 Y_AXIS_PADDING_FACTOR = 1.2
 
+# Stdout writes inside the animation callback are synchronous and can stall
+# the timer; keep the hot path quiet by default and rate-limit what remains.
+log = logging.getLogger(__name__)
+_last_log = 0.0
+
 # --- Global variables ---
 board = None
 eeg_channels = []
+# ndarray copy of eeg_channels so fancy indexing skips the per-call
+# list-to-array conversion
+eeg_idx = None
 sampling_rate = 0
 window_size = 0
-data_buffer = np.array([])
-y_limits = {}
+# Per-channel smoothed y-limits as ndarrays so the EMA runs vectorized
+y_min = None
+y_max = None
+changed_scratch = None
+
+# Fixed-size ring buffer: growing the buffer with np.hstack reallocates and
+# copies every existing sample on each tick (O(N^2) over a session). The ring
+# is allocated once and writes wrap around, so steady-state allocation is zero.
+ring_buffer = None
+buffer_limit = 0
+write_idx = 0
+samples_filled = 0
+total_samples = 0
+plot_scratch = None
+
+# Acquisition runs on its own thread so a slow Matplotlib draw never delays
+# draining the BrainFlow ringbuffer; the GUI timer only reads the local ring.
+ACQ_POLL_INTERVAL_S = 0.02
+ring_lock = threading.Lock()
+acq_stop = threading.Event()
+last_drawn_total = 0
+
+# Hot/cold split: the acquisition thread also does the per-frame DSP
+# (extract, scale, center, limits, decimate) into draw_src; the GUI tick
+# just memcpies draw_src into its own gui_y buffer and blits.
+processed_total = 0
+pending_changed = None
+draw_src = None
+gui_y = None
+
+# Scratch buffers reused every tick: BoardShim.get_board_data allocates a
+# fresh float64 array per call, so read straight into read_scratch through the
+# same DLL entry point instead. eeg_scratch holds the scaled channel block.
+num_rows = 0
+max_chunk = 0
+read_scratch = None
+eeg_scratch = None
+centered_scratch = None
+time_vector = None
+
+# Min/max display decimation: the axes are only ~1000 px wide, so pushing
+# window_size points per line through Agg is wasted path cost. Each stride-
+# sized bucket is reduced to its min and max, preserving the envelope.
+DISPLAY_POINTS = 2000
+display_stride = 1
+display_buckets = 0
+display_scratch = None
+display_time = None
+
+def process_frame():
+    """Per-frame DSP, run on the acquisition thread with ring_lock held.
+
+    Extracts the EEG rows of the current window, scales to uV, removes the
+    DC offset, updates the smoothed y-limits and decimates to the display
+    envelope. The GUI tick only copies the finished result.
+    """
+    global processed_total
+    plot_data = ring_window()
+    if plot_data.shape[1] < window_size:
+        return
+
+    np.take(plot_data, eeg_idx, axis=0, out=eeg_scratch)
+    eeg_scratch *= np.float32(1e6)
+
+    # Center all channels, take per-channel extrema and run the y-limit
+    # EMA. With numba this is a single fused pass per channel; otherwise
+    # it falls back to the equivalent vectorized numpy ops.
+    if njit is not None:
+        _compute_frame_numba(eeg_scratch, centered_scratch, y_min, y_max,
+                             changed_scratch, Y_AXIS_PADDING_FACTOR, 0.1)
+        changed = changed_scratch
+    else:
+        means = eeg_scratch.mean(axis=1, keepdims=True)
+        np.subtract(eeg_scratch, means, out=centered_scratch)
+        max_vals = centered_scratch.max(axis=1)
+        min_vals = centered_scratch.min(axis=1)
+
+        # Pad degenerate (flat) channels so the limits stay distinct
+        flat = np.isclose(max_vals, min_vals)
+        max_vals[flat] += 1
+        min_vals[flat] -= 1
+
+        smoothing_factor = 0.1
+        new_max = (1 - smoothing_factor) * y_max + smoothing_factor * Y_AXIS_PADDING_FACTOR * max_vals
+        new_min = (1 - smoothing_factor) * y_min + smoothing_factor * Y_AXIS_PADDING_FACTOR * min_vals
+
+        span = y_max - y_min
+        changed = ((np.abs(new_max - y_max) > 0.1 * span)
+                   | (np.abs(new_min - y_min) > 0.1 * span))
+        y_max[:] = new_max
+        y_min[:] = new_min
+
+    # Decimate to the display resolution, keeping the min/max envelope
+    if display_stride > 1:
+        buckets = centered_scratch[:, :display_buckets * display_stride]
+        buckets = buckets.reshape(len(eeg_idx), display_buckets, display_stride)
+        np.min(buckets, axis=2, out=display_scratch[:, 0::2])
+        np.max(buckets, axis=2, out=display_scratch[:, 1::2])
+
+    # Limit changes are latched until the GUI tick consumes them
+    np.logical_or(pending_changed, changed, out=pending_changed)
+    processed_total = total_samples
+
+def acquisition_loop():
+    """Drain the BrainFlow buffer every ~20 ms and prepare the draw data.
+
+    Runs as a daemon thread; frequent small reads keep each copy cheap, and
+    doing the filtering/scaling here keeps the GUI tick down to a memcpy.
+    """
+    global _last_log
+    while not acq_stop.is_set():
+        try:
+            num_samples_available = board.get_board_data_count()
+            if num_samples_available > 0:
+                new_data = read_board_chunk(num_samples_available)
+                with ring_lock:
+                    ring_write(new_data)
+                    process_frame()
+
+                now = time.monotonic()
+                if now - _last_log > 1.0:
+                    log.debug("received %d new samples, %d buffered", new_data.shape[1], samples_filled)
+                    _last_log = now
+        except BrainFlowError as e:
+            if not acq_stop.is_set():
+                log.error("acquisition error: %s", e)
+            break
+        time.sleep(ACQ_POLL_INTERVAL_S)
+
+def read_board_chunk(num_samples):
+    """Read up to max_chunk packages into read_scratch, no per-call allocation.
+
+    Mirrors BoardShim.get_board_data but targets the preallocated scratch;
+    returns a (num_rows, k) view of it.
+    """
+    k = min(num_samples, max_chunk)
+    res = BoardControllerDLL.get_instance().get_board_data(
+        k, BrainFlowPresets.DEFAULT_PRESET, read_scratch, board.board_id, board.input_json)
+    if res != BrainFlowExitCodes.STATUS_OK.value:
+        raise BrainFlowError('unable to get board data', res)
+    return read_scratch[:k * num_rows].reshape(num_rows, k)
+
+def _compute_frame_numba(eeg, out, y_mn, y_mx, changed, padding, smoothing):
+    """Fused per-frame kernel: DC removal, extrema and y-limit EMA in one pass.
+
+    One cache-friendly sweep per channel instead of separate mean/subtract/
+    min/max passes; compiled with numba when it is installed.
+    """
+    for c in range(eeg.shape[0]):
+        n = eeg.shape[1]
+        m = 0.0
+        for k in range(n):
+            m += eeg[c, k]
+        m /= n
+        mn = 1e30
+        mx = -1e30
+        for k in range(n):
+            v = eeg[c, k] - m
+            out[c, k] = v
+            if v < mn:
+                mn = v
+            if v > mx:
+                mx = v
+        if mx - mn < 1e-9:
+            mx += 1.0
+            mn -= 1.0
+        new_max = (1 - smoothing) * y_mx[c] + smoothing * padding * mx
+        new_min = (1 - smoothing) * y_mn[c] + smoothing * padding * mn
+        span = y_mx[c] - y_mn[c]
+        changed[c] = (abs(new_max - y_mx[c]) > 0.1 * span
+                      or abs(new_min - y_mn[c]) > 0.1 * span)
+        y_mx[c] = new_max
+        y_mn[c] = new_min
+
+if njit is not None:
+    _compute_frame_numba = njit(cache=True, fastmath=True)(_compute_frame_numba)
+
+def ring_write(new_data):
+    """Copy a chunk of samples into the ring buffer, wrapping as needed."""
+    global write_idx, samples_filled, total_samples
+    k = new_data.shape[1]
+    if k >= buffer_limit:
+        # Chunk bigger than the whole ring: keep only the newest samples
+        ring_buffer[:] = new_data[:, -buffer_limit:]
+        write_idx = 0
+        samples_filled = buffer_limit
+        total_samples += k
+        return
+    end = write_idx + k
+    if end <= buffer_limit:
+        ring_buffer[:, write_idx:end] = new_data
+    else:
+        first = buffer_limit - write_idx
+        ring_buffer[:, write_idx:] = new_data[:, :first]
+        ring_buffer[:, :end - buffer_limit] = new_data[:, first:]
+    write_idx = end % buffer_limit
+    samples_filled = min(samples_filled + k, buffer_limit)
+    total_samples += k
+
+def ring_window():
+    """Return the newest min(samples_filled, window_size) samples.
+
+    Contiguous regions come back as views; only a wrapped read is assembled
+    into the preallocated plot_scratch array.
+    """
+    if samples_filled < window_size:
+        return ring_buffer[:, :write_idx]
+    if write_idx >= window_size:
+        return ring_buffer[:, write_idx - window_size:write_idx]
+    tail = window_size - write_idx
+    plot_scratch[:, :tail] = ring_buffer[:, -tail:]
+    plot_scratch[:, tail:] = ring_buffer[:, :write_idx]
+    return plot_scratch
 
 def main():
     """
     Connects to the Cerelog board and creates a robust, real-time, scrolling plot.
     """
-    global board, eeg_channels, sampling_rate, window_size, data_buffer, y_limits
+    global board, eeg_channels, eeg_idx, sampling_rate, window_size, y_min, y_max, changed_scratch
+
+    # One-line startup summaries at INFO; the hot path logs at DEBUG so it
+    # stays silent unless explicitly enabled
+    logging.basicConfig(level=logging.INFO)
+    global ring_buffer, buffer_limit, plot_scratch
+    global num_rows, max_chunk, read_scratch, eeg_scratch, centered_scratch, time_vector
+    global display_stride, display_buckets, display_scratch, display_time
+    global pending_changed, draw_src, gui_y
 
     params = BrainFlowInputParams()
     params.timeout = 15
@@ -30,35 +266,65 @@ def main():
 
     try:
         eeg_channels = BoardShim.get_eeg_channels(BOARD_ID)
+        eeg_idx = np.asarray(eeg_channels, dtype=np.intp)
         sampling_rate = BoardShim.get_sampling_rate(BOARD_ID)
         window_size = SECONDS_TO_DISPLAY * sampling_rate
 
-        for i in range(len(eeg_channels)):
-            y_limits[i] = (-100, 100)
+        y_min = np.full(len(eeg_channels), -100.0)
+        y_max = np.full(len(eeg_channels), 100.0)
+        changed_scratch = np.zeros(len(eeg_channels), dtype=np.bool_)
+        pending_changed = np.zeros(len(eeg_channels), dtype=np.bool_)
 
-        print(f"Connecting to {board.get_board_descr(BOARD_ID)['name']}...")
+        # Single coalesced setup message instead of one stdout write per fact
+        log.info("board=%s eeg=%s fs=%d Hz; starting stream, close the plot window to stop",
+                 board.get_board_descr(BOARD_ID)['name'], eeg_channels, sampling_rate)
         board.prepare_session()
 
-        print("\nStarting stream... Close the plot window to stop.")
-
-        buffer_size_samples = 2 * 60 * sampling_rate 
+        buffer_size_samples = 2 * 60 * sampling_rate
         board.start_stream(buffer_size_samples)
 
 
         time.sleep(2)
 
-        initial_data = board.get_board_data()
+        # Keep a little more than the window size for smoother processing
+        num_rows = BoardShim.get_num_rows(BOARD_ID)
+        buffer_limit = int(window_size * 1.5)
+        # float32 end-to-end: the ADC has ~24 bits of precision at best and
+        # Agg renders in single precision anyway, so float64 just doubles the
+        # bandwidth of every per-frame copy/scale/subtract. Only read_scratch
+        # stays float64 because the DLL writes doubles into it.
+        ring_buffer = np.empty((num_rows, buffer_limit), dtype=np.float32)
+        plot_scratch = np.empty((num_rows, window_size), dtype=np.float32)
+        max_chunk = buffer_limit
+        read_scratch = np.zeros(num_rows * max_chunk, dtype=np.float64)
+        eeg_scratch = np.empty((len(eeg_channels), window_size), dtype=np.float32)
+        centered_scratch = np.empty((len(eeg_channels), window_size), dtype=np.float32)
+        # The x-axis never changes, so build it once instead of per frame
+        time_vector = np.linspace(0, SECONDS_TO_DISPLAY, num=window_size)
+
+        # Each bucket emits two points (min and max), so a stride of s
+        # draws 2*window/s points; solve for ~DISPLAY_POINTS out, and only
+        # engage when that actually shrinks the draw (stride 2 breaks even)
+        display_stride = (2 * window_size) // DISPLAY_POINTS
+        if display_stride <= 2:
+            display_stride = 1
+        if display_stride > 1:
+            display_buckets = window_size // display_stride
+            display_scratch = np.empty((len(eeg_channels), 2 * display_buckets), dtype=np.float32)
+            # Each bucket contributes two points (min, max) at its start time
+            display_time = np.repeat(time_vector[:display_buckets * display_stride:display_stride], 2)
+
+        initial_data = read_board_chunk(board.get_board_data_count())
         if initial_data.size > 0:
-            data_buffer = initial_data
-        else:
-            num_board_channels = BoardShim.get_num_rows(BOARD_ID)
-            data_buffer = np.empty((num_board_channels, 0))
+            ring_write(initial_data)
 
         # --- Plot Setup ---
         fig, axes = plt.subplots(4, 2, figsize=(18, 10), sharex=True)
         fig.suptitle('Real-Time Cerelog EEG Waveforms (Robust)', fontsize=16)
         axes_flat = axes.flatten()
-        lines = [ax.plot([], [], lw=1)[0] for ax in axes_flat]
+        # animated=True keeps the lines out of the regular draw tree so blitting
+        # only has to re-render the 8 Line2D artists, not the full 4x2 figure
+        lines = [ax.plot([], [], lw=1, animated=True)[0] for ax in axes_flat]
 
         for i, ax in enumerate(axes_flat):
             ax.set_title(f'Channel {eeg_channels[i]}')
@@ -66,11 +332,29 @@ def main():
             ax.grid(True)
             ax.set_xlim(0, SECONDS_TO_DISPLAY) # Use a relative time axis now
 
+        # x is pinned once and never changes; y points at the GUI-owned
+        # rows of gui_y, which update_plot refreshes with a memcpy and
+        # re-pins via set_ydata so the artists recache their paths
+        if display_stride > 1:
+            draw_t, draw_src = display_time, display_scratch
+        else:
+            draw_t, draw_src = time_vector, centered_scratch
+        gui_y = np.zeros_like(draw_src)
+        for i, line in enumerate(lines):
+            line.set_data(draw_t, gui_y[i])
+
         fig.text(0.5, 0.04, 'Time (s)', ha='center', va='center')
         plt.tight_layout(rect=[0, 0.05, 1, 0.96])
 
+        # Start draining the board on a background thread; the GUI timer
+        # only ever reads the local ring from here on
+        acq_thread = threading.Thread(target=acquisition_loop, daemon=True)
+        acq_thread.start()
+
         def on_close(event):
             print("Plot window closed, stopping stream...")
+            acq_stop.set()
+            acq_thread.join(timeout=1.0)
             if board and board.is_prepared():
                 board.stop_stream()
                 board.release_session()
@@ -78,7 +362,9 @@ def main():
 
         fig.canvas.mpl_connect('close_event', on_close)
 
-        ani = FuncAnimation(fig, update_plot, fargs=(lines, axes_flat), interval=UPDATE_INTERVAL_MS, blit=False)
+        # blit=True: each tick restores the cached background and re-draws only
+        # the returned artists instead of re-rendering all axes/ticks/labels
+        ani = FuncAnimation(fig, update_plot, fargs=(lines, axes_flat), interval=UPDATE_INTERVAL_MS, blit=True)
         plt.show()
 
     except Exception as e:
@@ -90,68 +376,39 @@ def main():
 def update_plot(frame, lines, axes):
     """
     This function is called periodically to update the plot data.
-    This version uses the CORRECT method to get real-time data.
+    The heavy lifting happens on the acquisition thread; this only copies
+    the prepared draw buffer and applies any pending axis-limit changes.
     """
-    global data_buffer, y_limits
-
+    global last_drawn_total
     try:
-        # --- 1. Get the number of new samples available ---
-        num_samples_available = board.get_board_data_count()
-
-        if num_samples_available > 0:
-            # --- 2. Get exactly that many samples ---
-            new_data = board.get_board_data(num_samples_available)
-            
-            # --- 3. Append to our local buffer ---
-            print(f"Received {new_data.shape[1]} new samples. Total buffer size: {data_buffer.shape[1]}")
-            data_buffer = np.hstack((data_buffer, new_data))
-        else:
-            # No new data, no need to redraw.
-            return lines
-
-        # --- 4. Manage buffer size (keep only the data we need for plotting) ---
-        # Keep a little more than the window size for smoother processing
-        buffer_limit = int(window_size * 1.5) 
-        if data_buffer.shape[1] > buffer_limit:
-            data_buffer = data_buffer[:, -buffer_limit:]
-
-        # --- 5. Prepare the slice of data for the current plot window ---
-        plot_data = data_buffer[:, -window_size:]
-        
-        # Ensure we have a full window of data to prevent dimension mismatch errors
-        if plot_data.shape[1] < window_size:
-            return lines # Not enough data yet to fill the plot, wait for next frame
-
-        eeg_plot_data = plot_data[eeg_channels] * 1e6
-        time_vector = np.linspace(0, SECONDS_TO_DISPLAY, num=window_size)
+        # All DSP already ran on the acquisition thread; just copy the
+        # finished draw buffer (the lines' ydata is pinned to gui_y) and
+        # apply any latched y-limit changes.
+        with ring_lock:
+            if processed_total == last_drawn_total:
+                # Nothing new was processed, no need to redraw.
+                return lines
+            last_drawn_total = processed_total
+            np.copyto(gui_y, draw_src)
+            # Mutating the ndarray is invisible to the artists: Line2D only
+            # recaches its path when set_*data flips the invalid flag, so
+            # re-pin each row (O(1) — stores the reference, no copy)
+            for i, line in enumerate(lines):
+                line.set_ydata(gui_y[i])
+            limits_changed = bool(pending_changed.any())
+            if limits_changed:
+                for i, ax in enumerate(axes):
+                    if pending_changed[i]:
+                        ax.set_ylim(y_min[i], y_max[i])
+                pending_changed[:] = False
 
-        # --- 6. Update each subplot ---
-        for i, (line, ax) in enumerate(zip(lines, axes)):
-            channel_data = eeg_plot_data[i]
-            
-            # Center the data by removing the DC offset for better visualization
-            centered_data = channel_data - np.mean(channel_data)
-            line.set_data(time_vector, centered_data)
-
-            # Adaptive Y-Axis Logic
-            max_val = np.max(centered_data)
-            min_val = np.min(centered_data)
-            if np.isclose(max_val, min_val):
-                max_val += 1; min_val -= 1
-            
-            target_max = max_val * Y_AXIS_PADDING_FACTOR
-            target_min = min_val * Y_AXIS_PADDING_FACTOR
-            
-            current_min, current_max = y_limits[i]
-            smoothing_factor = 0.1
-            new_max = current_max * (1 - smoothing_factor) + target_max * smoothing_factor
-            new_min = current_min * (1 - smoothing_factor) + target_min * smoothing_factor
-            
-            ax.set_ylim(new_min, new_max)
-            y_limits[i] = (new_min, new_max)
+        if limits_changed:
+            # The cached background is stale now; schedule one full redraw so
+            # FuncAnimation re-grabs it, then blitting resumes.
+            axes[0].figure.canvas.draw_idle()
 
     except Exception as e:
-        print(f"!!! ERROR IN UPDATE_PLOT: {e}")
+        log.error("error in update_plot: %s", e)
 
     return lines
 
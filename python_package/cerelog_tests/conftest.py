@@ -0,0 +1,62 @@
+"""pytest support for the Cerelog test scripts.
+
+The scripts stay runnable standalone and through run_all_tests.py; this
+conftest additionally makes them collectable by pytest so the suite can
+run in parallel with pytest-xdist:
+
+    pytest -n auto --dist loadgroup cerelog_tests
+
+There is only one physical Cerelog device, so every test that opens it
+is pinned to a single xdist worker via the "serial" load group; pure
+compute tests are free to run on any worker.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to the path to import Brainflow
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brainflow.board_shim import BoardIds, BrainFlowInputParams
+
+from test_baud_rate_switch import managed_board
+
+# Test functions that never touch the device and may run on any worker
+NON_DEVICE_TESTS = {"test_baud_rate_configuration_values"}
+
+
+@pytest.fixture(scope="module")
+def board():
+    """One prepared BoardShim session shared within a test module.
+
+    Module scope, not session: other test files open the device on their
+    own handles (serial.Serial / prepare_session), so a session-scoped
+    board would still be holding the one physical port when they run —
+    EBUSY on macOS, two handles competing for the byte stream on Linux.
+    Tearing down at module end frees the port before the next file.
+    """
+    with managed_board(BoardIds.CERELOG_X8_BOARD, BrainFlowInputParams()) as b:
+        yield b
+
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if item.name not in NON_DEVICE_TESTS:
+            item.add_marker(pytest.mark.xdist_group(name="serial"))
+
+
+def pytest_pyfunc_call(pyfuncitem):
+    """Fail items whose test function returns False.
+
+    The scripts report success with a returned bool (they catch their own
+    exceptions so they stay runnable standalone); to pytest a non-None
+    return is only a warning, so without this hook a failing hardware
+    test would still PASS.
+    """
+    kwargs = {name: pyfuncitem.funcargs[name]
+              for name in pyfuncitem._fixtureinfo.argnames}
+    if pyfuncitem.obj(**kwargs) is False:
+        pytest.fail(f"{pyfuncitem.name} returned False", pytrace=False)
+    return True
@@ -1,29 +1,97 @@
+import logging
 import time
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
+from scipy.signal import butter, sosfilt
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds
-from brainflow.data_filter import DataFilter, FilterTypes
 
 # --- Configuration ---
 BOARD_ID = BoardIds.CERELOG_X8_BOARD
 SECONDS_TO_DISPLAY = 20
-UPDATE_INTERVAL_MS = 1000 # 1 second, to prevent crashes without blitting
+UPDATE_INTERVAL_MS = 1000
+
+log = logging.getLogger(__name__)
 
 # --- Global variables ---
 board = None
 eeg_channels = []
+# ndarray copy of eeg_channels so fancy indexing skips the per-call
+# list-to-array conversion
+eeg_idx = None
 sampling_rate = 0
 window_size = 0
-# This is our persistent local data buffer
-data_buffer = np.array([])
+
+# Fixed-size ring buffer: np.hstack growth reallocates and copies the whole
+# buffer every tick. The ring is allocated once and writes wrap around.
+ring_buffer = None
+buffer_limit = 0
+write_idx = 0
+samples_filled = 0
+plot_scratch = None
+
+# Stateful high-pass: the SOS coefficients are computed once and zi carries
+# the IIR state across ticks, so each tick filters only the new samples
+# instead of re-filtering the whole 20 s window per channel.
+sos = None
+zi = None
+
+# Reused per-frame scratch for the uV-scaled channel rows, so scaling does
+# not allocate a fresh temporary per channel per tick
+uv_scratch = None
+
+# Once the window is full the x-axis never changes again; pin it once and
+# update only ydata afterwards (set_ydata skips the x-side revalidation)
+full_time_vector = None
+x_pinned = False
+
+# Timestamp-gap detection over whole chunks with one np.diff, so glitches
+# inside a chunk are caught too, not just across polling ticks
+timestamp_channel = -1
+expected_dt = 0.0
+last_ts = None
+
+def ring_write(new_data):
+    """Copy a chunk of samples into the ring buffer, wrapping as needed."""
+    global write_idx, samples_filled
+    k = new_data.shape[1]
+    if k >= buffer_limit:
+        ring_buffer[:] = new_data[:, -buffer_limit:]
+        write_idx = 0
+        samples_filled = buffer_limit
+        return
+    end = write_idx + k
+    if end <= buffer_limit:
+        ring_buffer[:, write_idx:end] = new_data
+    else:
+        first = buffer_limit - write_idx
+        ring_buffer[:, write_idx:] = new_data[:, :first]
+        ring_buffer[:, :end - buffer_limit] = new_data[:, first:]
+    write_idx = end % buffer_limit
+    samples_filled = min(samples_filled + k, buffer_limit)
+
+def ring_window():
+    """Return the newest min(samples_filled, window_size) samples.
+
+    Contiguous reads are views; a wrapped read is assembled into plot_scratch.
+    """
+    if samples_filled < window_size:
+        return ring_buffer[:, :write_idx]
+    if write_idx >= window_size:
+        return ring_buffer[:, write_idx - window_size:write_idx]
+    tail = window_size - write_idx
+    plot_scratch[:, :tail] = ring_buffer[:, -tail:]
+    plot_scratch[:, tail:] = ring_buffer[:, :write_idx]
+    return plot_scratch
 
 def main():
     """
     Connects to the Cerelog board. This version correctly handles data buffering
     and filtering to prevent visual artifacts like overwriting.
     """
-    global board, eeg_channels, sampling_rate, window_size, data_buffer
+    global board, eeg_channels, eeg_idx, sampling_rate, window_size
+    global ring_buffer, buffer_limit, plot_scratch, sos, zi, uv_scratch, full_time_vector
+    global timestamp_channel, expected_dt
 
     params = BrainFlowInputParams()
     params.timeout = 15
@@ -31,17 +99,34 @@ def main():
 
     try:
         eeg_channels = BoardShim.get_eeg_channels(BOARD_ID)
+        eeg_idx = np.asarray(eeg_channels, dtype=np.intp)
         sampling_rate = BoardShim.get_sampling_rate(BOARD_ID)
         window_size = int(SECONDS_TO_DISPLAY * sampling_rate)
 
-        # Initialize our local buffer with the correct number of rows
+        # Keep more than the window size to provide context for the filter
         num_board_channels = BoardShim.get_num_rows(BOARD_ID)
-        data_buffer = np.empty((num_board_channels, 0))
-
-        print(f"Connecting to {board.get_board_descr(BOARD_ID)['name']}...")
+        buffer_limit = int(window_size * 1.5)
+        # float32: the data has ~24-bit ADC precision and Agg renders in
+        # single precision, so float64 storage just doubles memory traffic
+        ring_buffer = np.empty((num_board_channels, buffer_limit), dtype=np.float32)
+        plot_scratch = np.empty((num_board_channels, window_size), dtype=np.float32)
+        uv_scratch = np.empty((len(eeg_channels), window_size), dtype=np.float32)
+        full_time_vector = np.linspace(0, SECONDS_TO_DISPLAY, num=window_size)
+
+        timestamp_channel = BoardShim.get_timestamp_channel(BOARD_ID)
+        expected_dt = 1.0 / sampling_rate
+
+        # 4th-order Butterworth high-pass at 0.5 Hz, same response as the old
+        # per-frame DataFilter.perform_highpass calls
+        sos = butter(4, 0.5, btype='highpass', fs=sampling_rate, output='sos')
+        zi = np.zeros((sos.shape[0], len(eeg_channels), 2))
+
+        # Single coalesced setup message instead of one stdout write per fact
+        logging.basicConfig(level=logging.INFO)
+        log.info("board=%s eeg=%s fs=%d Hz; plot fills for %ds then scrolls (updates once/sec)",
+                 board.get_board_descr(BOARD_ID)['name'], eeg_channels, sampling_rate,
+                 SECONDS_TO_DISPLAY)
         board.prepare_session()
-
-        print("\nStarting stream... Plot will fill for 20s then scroll (updates once/sec).")
         board.start_stream(120 * sampling_rate) # 2-minute internal buffer
         time.sleep(1)
 
@@ -49,7 +134,8 @@ def main():
         fig, axes = plt.subplots(4, 2, figsize=(18, 10), sharex=True)
         fig.suptitle(f'Definitive Slow-Update Plot (Correct Buffering)', fontsize=16)
         axes_flat = axes.flatten()
-        lines = [ax.plot([], [], lw=1)[0] for ax in axes_flat]
+        # animated=True so blitting only re-renders the lines, not the axes
+        lines = [ax.plot([], [], lw=1, animated=True)[0] for ax in axes_flat]
 
         for i, ax in enumerate(axes_flat):
             ax.set_title(f'Channel {eeg_channels[i]}')
@@ -61,8 +147,9 @@ def main():
         fig.text(0.5, 0.04, 'Time (s)', ha='center', va='center')
         plt.tight_layout(rect=[0, 0.05, 1, 0.96])
 
+        # blit=True: restore the cached background and re-draw only the lines
         ani = FuncAnimation(fig, update_plot, fargs=(lines, axes_flat),
-                            interval=UPDATE_INTERVAL_MS, blit=False)
+                            interval=UPDATE_INTERVAL_MS, blit=True)
         
         plt.show()
 
@@ -79,54 +166,77 @@ def update_plot(frame, lines, axes):
     """
     Correctly fetches, buffers, copies, and filters data for a stable plot.
     """
-    global data_buffer
+    global zi, last_ts
     try:
         # 1. Get new data from BrainFlow
         num_samples_available = board.get_board_data_count()
         if num_samples_available > 0:
             new_data = board.get_board_data(num_samples_available)
-            # 2. Append new raw data to our persistent local buffer
-            data_buffer = np.hstack((data_buffer, new_data))
-        
-        # 3. Keep our local buffer from growing forever
-        # Keep more than the window size to provide context for the filter
-        buffer_limit = int(window_size * 1.5)
-        if data_buffer.shape[1] > buffer_limit:
-            data_buffer = data_buffer[:, -buffer_limit:]
 
-        # 4. Create a final, temporary copy of the data SLICE we want to plot
-        # This is the key fix: we are now filtering a disposable copy.
-        plot_slice = data_buffer[:, -window_size:].copy()
-        
+            # Vectorized gap check over the whole chunk, including the seam
+            # to the previous chunk
+            ts = new_data[timestamp_channel]
+            if last_ts is not None:
+                gaps = np.diff(ts, prepend=last_ts)
+            else:
+                gaps = np.diff(ts)
+            if ts.size:
+                last_ts = ts[-1]
+            bad = np.flatnonzero(gaps > 2 * expected_dt)
+            if bad.size:
+                print(f"[WARN] {bad.size} timestamp gaps in chunk, worst={gaps[bad].max():.3f}s")
+
+            # 2. High-pass only the new samples; zi carries the filter state
+            # across ticks so the stored data is already filtered
+            filtered, zi = sosfilt(sos, new_data[eeg_idx], axis=1, zi=zi)
+            new_data[eeg_idx] = filtered
+            ring_write(new_data)
+
+        # 3. The ring already holds filtered data, so the plot window can be
+        # read as a view -- nothing mutates it anymore
+        plot_slice = ring_window()
+
         num_plot_points = plot_slice.shape[1]
         
         # Don't try to plot if we have nothing
         if num_plot_points == 0:
             return []
 
-        # 5. Create a time vector that matches the amount of data we have
-        time_vector = np.linspace(0, num_plot_points / sampling_rate, num=num_plot_points)
-        
+        # 5. While the plot is still filling, the time vector grows each frame;
+        # once full it is the precomputed constant and only ydata changes
+        global x_pinned
+        full_window = num_plot_points == window_size
+        if not full_window:
+            time_vector = np.linspace(0, num_plot_points / sampling_rate, num=num_plot_points)
+
+        limits_changed = False
         for i, (line, ax) in enumerate(zip(lines, axes)):
             channel_idx = eeg_channels[i]
-            
-            # 6. Filter the disposable copy. Our main `data_buffer` remains pristine.
-            DataFilter.perform_highpass(plot_slice[channel_idx], sampling_rate, 0.5, 4, FilterTypes.BUTTERWORTH.value, 0)
 
-            plot_data_uV = plot_slice[channel_idx] * 1e6
+            plot_data_uV = np.multiply(plot_slice[channel_idx], np.float32(1e6),
+                                       out=uv_scratch[i, :num_plot_points])
 
-            line.set_data(time_vector, plot_data_uV)
-            
-            # 7. Rescale the X-axis to make the data "fill up" initially
-            ax.set_xlim(0, SECONDS_TO_DISPLAY)
+            if full_window and x_pinned:
+                line.set_ydata(plot_data_uV)
+            else:
+                line.set_data(full_time_vector if full_window else time_vector, plot_data_uV)
 
-            # Adaptive Y-Axis
+            # Adaptive Y-Axis: only rescale when the limit moved by more than
+            # 10%, since set_ylim invalidates the blit background
             max_abs_val = np.max(np.abs(plot_data_uV))
             if max_abs_val < 50: max_abs_val = 50
             target_ylim = max_abs_val * 1.2
             current_min, current_max = ax.get_ylim()
-            if target_ylim > current_max or target_ylim < current_max * 0.5:
-                 ax.set_ylim(-target_ylim, target_ylim)
+            if abs(target_ylim - current_max) > 0.1 * current_max:
+                ax.set_ylim(-target_ylim, target_ylim)
+                limits_changed = True
+
+        if full_window:
+            x_pinned = True
+
+        if limits_changed:
+            # Stale background: one full redraw so FuncAnimation re-grabs it
+            axes[0].figure.canvas.draw_idle()
 
     except Exception as e:
         print(f"!!! ERROR IN UPDATE_PLOT: {e}")
@@ -46,14 +46,13 @@ def main():
         # Extract the specific channel data and convert from Volts to microVolts
         channel_data_uV = data[LOG_CHANNEL_ID] * 1e6
 
-        # Write every single sample to the output file
+        # Write every single sample to the output file. np.savetxt formats in
+        # C and issues large buffered writes instead of one write() per sample.
         print(f"Writing {len(channel_data_uV)} samples to '{OUTPUT_FILENAME}'...")
-        with open(OUTPUT_FILENAME, 'w') as f:
-            f.write(f"# Raw, unfiltered data dump from Channel {LOG_CHANNEL_ID}\n")
-            f.write(f"# Total Samples: {len(channel_data_uV)}\n")
-            f.write("# ---\n")
-            for sample in channel_data_uV:
-                f.write(f"{sample:.4f}\n")
+        header = (f"Raw, unfiltered data dump from Channel {LOG_CHANNEL_ID}\n"
+                  f"Total Samples: {len(channel_data_uV)}\n"
+                  "---")
+        np.savetxt(OUTPUT_FILENAME, channel_data_uV, fmt='%.4f', header=header, comments='# ')
         
         print("\nSUCCESS: Data dump complete.")
         print(f"You can now open '{OUTPUT_FILENAME}' in a text editor to inspect every value.")
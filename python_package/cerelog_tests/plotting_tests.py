@@ -1,6 +1,7 @@
 import time
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError
 
@@ -53,31 +54,32 @@ def main():
         # Create a time axis starting from 0
         time_axis = timestamps - timestamps[0]
 
-        print("Plotting data in a 4x2 subplot grid...")
+        print("Plotting all channels as a single LineCollection...")
 
-        # Create a figure and a grid of subplots (4 rows, 2 columns)
-        # `sharex=True` ensures all subplots share the same time axis
-        fig, axes = plt.subplots(4, 2, figsize=(18, 10), sharex=True)
-        
-        # Add a main title for the entire figure
+        # One axes with vertically offset channels: a single LineCollection
+        # carries all 8 traces, so the figure renders one artist instead of
+        # eight Line2D objects each with their own validation/draw overhead.
+        # That matters for 30 s captures at 500 Hz (15k points per channel).
+        fig, ax = plt.subplots(figsize=(18, 10))
         fig.suptitle(f'{duration_seconds} Seconds of Cerelog EEG Data', fontsize=16)
 
-        # Flatten the 2D array of axes for easy iteration
-        axes = axes.flatten()
+        # Offset spacing from the bulk of the signal, robust to spikes
+        offset_value = 3 * np.percentile(np.abs(eeg_data), 99)
+        if offset_value == 0:
+            offset_value = 1.0
 
-        # Plot each EEG channel on its own subplot
-        for i, channel_id in enumerate(eeg_channels):
-            ax = axes[i]
-            ax.plot(time_axis, eeg_data[i], linewidth=0.8)
-            ax.set_title(f'Channel {channel_id}')
-            ax.set_ylabel('Voltage (µV)')
-            ax.grid(True)
-        
-        # Add a shared X-axis label to the bottom of the figure
-        fig.text(0.5, 0.04, 'Time (s)', ha='center', va='center')
-        
-        # Adjust layout to prevent titles and labels from overlapping
-        plt.tight_layout(rect=[0, 0.05, 1, 0.96])
+        segments = [np.column_stack([time_axis, eeg_data[i] + i * offset_value])
+                    for i in range(len(eeg_channels))]
+        ax.add_collection(LineCollection(segments, linewidths=0.8))
+
+        # Label each offset baseline with its channel id
+        ax.set_yticks([i * offset_value for i in range(len(eeg_channels))])
+        ax.set_yticklabels([f'Channel {ch}' for ch in eeg_channels])
+        ax.set_xlabel('Time (s)')
+        ax.grid(True)
+        ax.autoscale()
+
+        plt.tight_layout(rect=[0, 0, 1, 0.96])
 
         # Show the plot
         plt.show()
@@ -4,114 +4,237 @@ Comprehensive Test Runner for Cerelog X8 Integration
 Runs all tests and provides a summary report
 """
 
-import subprocess
+import hashlib
+import importlib
+import io
+import logging
+import re
+import shelve
 import sys
+import threading
 import time
 import os
+import traceback
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
 from datetime import datetime
 
 # Suppress deprecation warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="pkg_resources")
 
-def run_test(test_name, test_file, description):
-    """Run a single test and return results"""
-    print(f"\n{'='*60}")
-    print(f"[TEST] Running: {test_name}")
-    print(f"[INFO] Description: {description}")
-    print(f"{'='*60}")
-    
-    start_time = time.time()
+# Deprecation noise to drop from captured stderr, compiled once
+NOISE_PATTERN = re.compile(r'UserWarning|pkg_resources|deprecated', re.IGNORECASE)
+
+# Result cache for incremental re-runs; bypass with --force
+CACHE_FILE = '.test_cache'
+
+# redirect_stdout/redirect_stderr swap the process-global streams, not
+# thread-local ones, so concurrent captures would steal each other's
+# output; this lock serializes the capture-and-run section across workers
+_capture_lock = threading.Lock()
+
+def _brainflow_stamp():
+    """mtime of the brainflow bindings, so a rebuilt library invalidates the cache."""
+    shim = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'brainflow', 'board_shim.py')
     try:
-        result = subprocess.run([sys.executable, test_file], 
-                              capture_output=True, text=True, timeout=60)
-        duration = time.time() - start_time
-        
-        # Check if stderr contains only deprecation warnings
-        stderr_clean = result.stderr
-        if stderr_clean:
-            # Remove deprecation warnings from stderr
-            lines = stderr_clean.split('\n')
-            filtered_lines = []
-            for line in lines:
-                if 'UserWarning' not in line and 'pkg_resources' not in line and 'deprecated' not in line.lower():
-                    filtered_lines.append(line)
-            stderr_clean = '\n'.join(filtered_lines)
-        
-        if result.returncode == 0:
-            print(f"[SUCCESS] {test_name} PASSED ({duration:.1f}s)")
-            return True, result.stdout, stderr_clean
-        else:
-            print(f"[FAILED] {test_name} FAILED ({duration:.1f}s)")
+        return os.path.getmtime(shim)
+    except OSError:
+        return 0
+
+# Top-level import statements, scanned to find sibling-module dependencies
+_IMPORT_RE = re.compile(r'^(?:from|import)\s+(\w+)', re.MULTILINE)
+
+def _local_import_stamps(test_file):
+    """mtimes of sibling modules the test imports, recursively.
+
+    The tests import each other (test_handshake pulls its frame builder
+    from test_serial), so a test's cached PASS must also go stale when a
+    helper it imports is edited, not just the test's own file.
+    """
+    stamps = []
+    seen = set()
+    pending = [test_file]
+    while pending:
+        path = pending.pop()
+        try:
+            with open(path) as f:
+                src = f.read()
+        except OSError:
+            continue
+        for name in _IMPORT_RE.findall(src):
+            dep = f"{name}.py"
+            if dep not in seen and os.path.exists(dep):
+                seen.add(dep)
+                stamps.append(f"{dep}:{os.path.getmtime(dep)}")
+                pending.append(dep)
+    return ','.join(sorted(stamps))
+
+def cache_key(test_file):
+    """Key a test result on its own mtime, its local imports' mtimes, and
+    the brainflow stamp."""
+    stamp = (f"{test_file}:{os.path.getmtime(test_file)}:"
+             f"{_local_import_stamps(test_file)}:{_brainflow_stamp()}")
+    return hashlib.blake2b(stamp.encode()).hexdigest()
+
+def run_test(test_name, test_file, description):
+    """Import the test module and call its run() entry point in-process.
+
+    Each test module exposes `def run(): ... return success_bool`, so the
+    whole suite shares one interpreter (and one loaded brainflow library)
+    instead of paying a fresh Python + import startup per test file.
+    """
+    # The whole section — banner, capture, verdict prints — runs under
+    # the capture lock so another worker's redirect cannot swallow it
+    with _capture_lock:
+        print(f"\n{'='*60}")
+        print(f"[TEST] Running: {test_name}")
+        print(f"[INFO] Description: {description}")
+        print(f"{'='*60}")
+
+        module_name = os.path.splitext(os.path.basename(test_file))[0]
+        buf = io.StringIO()
+        ebuf = io.StringIO()
+        # Monotonic integer clock: immune to wall-clock jumps mid-test
+        t0 = time.perf_counter_ns()
+        try:
+            with redirect_stdout(buf), redirect_stderr(ebuf):
+                module = importlib.import_module(module_name)
+                # Modules that call logging.basicConfig(stream=sys.stdout) at
+                # import time bind the root handler to whichever test's buffer
+                # was active when they were first imported (later basicConfig
+                # calls are no-ops). Re-point the stream handlers at this
+                # test's buffer so its log output lands in its own report.
+                for handler in logging.getLogger().handlers:
+                    if isinstance(handler, logging.StreamHandler):
+                        handler.setStream(buf)
+                success = bool(module.run())
+            duration = (time.perf_counter_ns() - t0) / 1e9
+
+            # Drop deprecation noise from captured stderr with one regex scan per line
+            stderr_clean = ebuf.getvalue()
             if stderr_clean:
-                print(f"Error: {stderr_clean}")
-            return False, result.stdout, stderr_clean
-            
-    except subprocess.TimeoutExpired:
-        print(f"[TIMEOUT] {test_name} TIMEOUT (>60s)")
-        return False, "", "Timeout"
-    except Exception as e:
-        print(f"[ERROR] {test_name} ERROR: {e}")
-        return False, "", str(e)
+                stderr_clean = '\n'.join(line for line in stderr_clean.split('\n')
+                                         if not NOISE_PATTERN.search(line))
+
+            if success:
+                print(f"[SUCCESS] {test_name} PASSED ({duration:.1f}s)")
+                return True, buf.getvalue(), stderr_clean
+            else:
+                print(f"[FAILED] {test_name} FAILED ({duration:.1f}s)")
+                if stderr_clean:
+                    print(f"Error: {stderr_clean}")
+                return False, buf.getvalue(), stderr_clean
+
+        except Exception as e:
+            print(f"[ERROR] {test_name} ERROR: {e}")
+            return False, buf.getvalue(), traceback.format_exc()
 
 def main():
     """Run all tests and generate summary"""
     print("[START] Cerelog X8 Integration Test Suite")
-    print(f"[TIME] Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    start_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[TIME] Started at: {start_str}")
     
+    # "serial": True marks tests that open the one Cerelog device; they must
+    # never run concurrently with each other, so they execute as a single
+    # sequential chain on one worker while everything else fans out.
     tests = [
         {
             "name": "Raw Serial Test ::: This test now works",
             "file": "test_serial.py",
-            "description": "Tests direct serial communication (bypasses BrainFlow)"
+            "description": "Tests direct serial communication (bypasses BrainFlow)",
+            "serial": True
         },
         {
             "name": "Handshake Test",
             "file": "test_handshake.py",
-            "description": "Tests handshake protocol, baud rate switching, and ring buffer implementation"
+            "description": "Tests handshake protocol, baud rate switching, and ring buffer implementation",
+            "serial": True
         },
         {
             "name": "BrainFlow Integration Test",
             "file": "test_brainflow.py",
-            "description": "Tests basic BrainFlow integration, handshake, and data streaming"
+            "description": "Tests basic BrainFlow integration, handshake, and data streaming",
+            "serial": True
         },
         {
             "name": "EEG Validation Test",
-            "file": "test_validate_eeg.py", 
-            "description": "Tests EEG signal quality, RMS, voltage ranges, and CMRR"
+            "file": "test_validate_eeg.py",
+            "description": "Tests EEG signal quality, RMS, voltage ranges, and CMRR",
+            "serial": True
         },
         {
-            "name": "Unix Timestamp Test", 
+            "name": "Unix Timestamp Test",
             "file": "test_unix_timestamps.py",
-            "description": "Tests timestamp synchronization between Arduino and BrainFlow"
+            "description": "Tests timestamp synchronization between Arduino and BrainFlow",
+            "serial": True
         },
         {
             "name": "Baud Rate Switch Test",
             "file": "test_baud_rate_switch.py",
-            "description": "Tests dynamic baud rate configuration and handshake switching"
+            "description": "Tests dynamic baud rate configuration and handshake switching",
+            "serial": True
         }
     ]
-    
+
     results = []
     passed = 0
     failed = 0
-    
+
+    force = '--force' in sys.argv
+    cache = shelve.open(CACHE_FILE)
+
+    runnable = []
     for test in tests:
-        if os.path.exists(test["file"]):
-            success, stdout, stderr = run_test(test["name"], test["file"], test["description"])
-            results.append({
-                "name": test["name"],
-                "success": success,
-                "stdout": stdout,
-                "stderr": stderr
-            })
-            if success:
-                passed += 1
-            else:
-                failed += 1
-        else:
+        if not os.path.exists(test["file"]):
             print(f"[WARNING] {test['name']}: File not found ({test['file']})")
             failed += 1
+            continue
+        test["cache_key"] = cache_key(test["file"])
+        if not force and cache.get(test["cache_key"]) == "PASS":
+            print(f"[CACHED] {test['name']}: unchanged since last PASS, skipping (--force to rerun)")
+            results.append({"name": test["name"], "success": True, "stdout": "", "stderr": ""})
+            passed += 1
+            continue
+        runnable.append(test)
+
+    serial_tests = [t for t in runnable if t.get("serial")]
+    parallel_tests = [t for t in runnable if not t.get("serial")]
+
+    def run_serial_chain():
+        """Run all device-exclusive tests back to back on one worker."""
+        return [(t, run_test(t["name"], t["file"], t["description"])) for t in serial_tests]
+
+    # Workers mostly block on serial/board I/O, so threads are enough here
+    with ThreadPoolExecutor(max_workers=min(len(runnable), os.cpu_count() or 1) or 1) as executor:
+        chain_future = executor.submit(run_serial_chain)
+        futures = {executor.submit(run_test, t["name"], t["file"], t["description"]): t
+                   for t in parallel_tests}
+
+        # No per-test timeout: the tests run on threads in this process and
+        # a thread cannot be killed, so a hung test hangs the runner exactly
+        # as it would standalone. Timeout enforcement would need a
+        # subprocess per test, which is what in-process running trades away.
+        completed = []
+        for f in as_completed(futures):
+            completed.append((futures[f], f.result()))
+        completed.extend(chain_future.result())
+
+    for test, (success, stdout, stderr) in completed:
+        results.append({
+            "name": test["name"],
+            "success": success,
+            "stdout": stdout,
+            "stderr": stderr
+        })
+        cache[test["cache_key"]] = "PASS" if success else "FAIL"
+        if success:
+            passed += 1
+        else:
+            failed += 1
+    cache.close()
     
     # Summary report
     print(f"\n{'='*60}")
@@ -120,7 +243,8 @@ def main():
     print(f"[SUCCESS] Passed: {passed}")
     print(f"[FAILED] Failed: {failed}")
     print(f"[STATS] Success Rate: {passed/(passed+failed)*100:.1f}%")
-    print(f"[TIME] Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    end_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[TIME] Completed at: {end_str}")
     
     if failed > 0:
         print(f"\n[FAILED] FAILED TESTS:")
@@ -147,10 +271,13 @@ def main():
         "test_validate_eeg.log",
         "test_baud_rate_switch.log"
     ]
+    # One directory scan instead of an exists()+getsize() stat pair per file
+    log_sizes = {e.name: e.stat().st_size for e in os.scandir('.')
+                 if e.is_file() and e.name.endswith('.log')}
     for log_file in log_files:
-        if os.path.exists(log_file):
-            size = os.path.getsize(log_file) / 1024  # KB
-            print(f"  - {log_file} ({size:.1f} KB)")
+        size = log_sizes.get(log_file)
+        if size is not None:
+            print(f"  - {log_file} ({size / 1024:.1f} KB)")
         else:
             print(f"  - {log_file} (not generated)")
     
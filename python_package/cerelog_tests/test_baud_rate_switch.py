@@ -9,9 +9,11 @@ This test verifies that:
 4. Data streaming continues at the configured baud rate
 """
 
+import logging
 import time
 import sys
 import os
+from contextlib import contextmanager
 
 # Add the parent directory to the path to import brainflow
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,160 +21,188 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from brainflow.board_shim import BoardShim, BrainFlowPresets, BoardIds, BrainFlowInputParams, BrainFlowError
 from brainflow.data_filter import DataFilter
 
+# Lazy %-style logging: arguments are only formatted if the record is emitted
+logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+log = logging.getLogger(__name__)
 
-def test_dynamic_baud_rate_configuration():
+# Baud rate configuration mapping (handshake reg_val -> baud), a load-time
+# constant shared with other modules instead of a dict rebuilt per call
+BAUD_CONFIGS = (
+    #(0x00, 9600),     # Default
+    #(0x01, 19200),    # Low speed
+    #(0x02, 38400),    # Medium speed
+    #(0x03, 57600),    # High speed
+    (0x04, 115200),   # Very high speed
+    #(0x05, 230400),   # Ultra high speed (macOS target)
+    #(0x06, 460800),   # Maximum speed
+    #(0x07, 921600),   # Super speed
+)
+
+
+def wait_for_samples(board, n, timeout=10):
+    """Poll the board buffer and return as soon as n samples are ready."""
+    t0 = time.time()
+    while board.get_board_data_count() < n:
+        if time.time() - t0 > timeout:
+            break
+        time.sleep(0.05)
+
+
+@contextmanager
+def managed_board(board_id, input_params):
+    """Yield a prepared BoardShim and guarantee release_session on exit.
+
+    prepare_session performs the handshake and baud switch (seconds per
+    call), so the hardware tests share one session instead of paying it
+    per test function.
+    """
+    board = BoardShim(board_id, input_params)
+    board.prepare_session()
+    try:
+        yield board
+    finally:
+        board.release_session()
+
+
+def test_dynamic_baud_rate_configuration(board):
     """Test the dynamic baud rate configuration through handshake."""
-    
-    print("=== Dynamic Baud Rate Configuration Test ===")
-    print("This test verifies baud rate configuration through handshake parameters")
-    print("")
-    
-    # Board configuration
+
+    log.info("=== Dynamic Baud Rate Configuration Test ===")
+    log.info("This test verifies baud rate configuration through handshake parameters")
+    log.info("")
+
     board_id = BoardIds.CERELOG_X8_BOARD
-    input_params = BrainFlowInputParams()
-    board = BoardShim(board_id, input_params)
-    
+
     try:
-        print("1. Preparing session (should send baud rate config in handshake)...")
-        board.prepare_session()
-        print("   [SUCCESS] Session prepared successfully")
-        print("   [SUCCESS] Handshake sent with baud rate configuration")
-        
-        print("\n2. Starting stream (should be at configured baud rate)...")
+        log.info("1. Session already prepared (baud rate config sent in handshake)")
+        log.info("   [SUCCESS] Handshake sent with baud rate configuration")
+
+        log.info("\n2. Starting stream (should be at configured baud rate)...")
         board.start_stream(45000)  # 45 second buffer
-        print("   [SUCCESS] Stream started successfully")
-        
-        print("\n3. Collecting data for 3 seconds...")
-        time.sleep(3)  # Collect data for 3 seconds (1500 samples at 500 Hz)
-        
+        log.info("   [SUCCESS] Stream started successfully")
+
+        log.info("\n3. Collecting data (up to 3 seconds)...")
+        sample_rate = BoardShim.get_sampling_rate(board_id)
+        wait_for_samples(board, sample_rate * 3, timeout=3)  # 1500 samples at 500 Hz
+
         # Get data
         data = board.get_board_data()
         num_samples = data.shape[1] if data.size > 0 else 0
-        
-        print(f"   [SUCCESS] Collected {num_samples} samples")
-        
+
+        log.info("   [SUCCESS] Collected %d samples", num_samples)
+
         if num_samples > 0:
-            print(f"   [SUCCESS] Data shape: {data.shape}")
-            print(f"   [SUCCESS] Sample rate: {num_samples / 3:.1f} Hz")
-            
+            log.info("   [SUCCESS] Data shape: %s", data.shape)
+            log.info("   [SUCCESS] Sample rate: %.1f Hz", num_samples / 3)
+
             # Check if we have data on all channels
             eeg_channels = board.get_eeg_channels(board_id)
             if len(eeg_channels) >= 8:
-                print(f"   [SUCCESS] All {len(eeg_channels)} EEG channels active")
-        
-        print("\n4. Stopping stream...")
+                log.info("   [SUCCESS] All %d EEG channels active", len(eeg_channels))
+
+        log.info("\n4. Stopping stream...")
         board.stop_stream()
-        print("   [SUCCESS] Stream stopped successfully")
-        
-        print("\n5. Releasing session...")
-        board.release_session()
-        print("   [SUCCESS] Session released successfully")
-        
-        print("\n=== Test Results ===")
+        log.info("   [SUCCESS] Stream stopped successfully")
+
+        log.info("\n=== Test Results ===")
         if num_samples > 0:
-            print("[SUCCESS] SUCCESS: Dynamic baud rate configuration appears to be working")
-            print("[SUCCESS] Data streaming is active at configured baud rate")
+            log.info("[SUCCESS] SUCCESS: Dynamic baud rate configuration appears to be working")
+            log.info("[SUCCESS] Data streaming is active at configured baud rate")
         else:
-            print("[FAILED] FAILURE: No data received")
+            log.info("[FAILED] FAILURE: No data received")
             return False
-            
+
     except Exception as e:
-        print(f"[ERROR] ERROR: {e}")
+        log.error("[ERROR] ERROR: %s", e)
         return False
-    
+
     return True
 
 
 def test_baud_rate_configuration_values():
     """Test different baud rate configuration values."""
-    
-    print("\n=== Baud Rate Configuration Values Test ===")
-    print("This test verifies the baud rate configuration mapping")
-    print("")
-    
-    # Baud rate configuration mapping
-    baud_configs = {
-        #0x00: 9600,     # Default
-       # 0x01: 19200,    # Low speed
-       # 0x02: 38400,    # Medium speed
-       # 0x03: 57600,    # High speed
-        0x04: 115200,   # Very high speed
-      #  0x05: 230400,   # Ultra high speed (macOS target)
-      #  0x06: 460800,   # Maximum speed
-       #  0x07: 921600,   # Super speed
-    }
-    
-    print("Baud Rate Configuration Mapping:")
-    for config_val, baud_rate in baud_configs.items():
-        print(f"   Config 0x{config_val:02X} is {baud_rate:,} baud")
-    
-    print(f"\nExpected target baud rate for macOS: {baud_configs[0x04]:,} baud")
-    
+
+    log.info("\n=== Baud Rate Configuration Values Test ===")
+    log.info("This test verifies the baud rate configuration mapping")
+    log.info("")
+
+    log.info("Baud Rate Configuration Mapping:")
+    for config_val, baud_rate in BAUD_CONFIGS:
+        log.info("   Config 0x%02X is %s baud", config_val, format(baud_rate, ','))
+
+    log.info("\nExpected target baud rate for macOS: %s baud",
+             format(dict(BAUD_CONFIGS)[0x04], ','))
+
     return True
 
 
-def test_manual_configuration_disabled():
+def test_manual_configuration_disabled(board):
     """Test that manual configuration is properly disabled."""
-    
-    print("\n=== Manual Configuration Test ===")
-    print("This test verifies manual configuration is disabled")
-    print("")
-    
-    board_id = BoardIds.CERELOG_X8_BOARD
-    input_params = BrainFlowInputParams()
-    board = BoardShim(board_id, input_params)
-    
+
+    log.info("\n=== Manual Configuration Test ===")
+    log.info("This test verifies manual configuration is disabled")
+    log.info("")
+
     try:
-        print("1. Preparing session...")
-        board.prepare_session()
-        
-        print("2. Testing manual baud rate configuration...")
+        log.info("1. Testing manual baud rate configuration...")
         try:
             response = board.config_board("baud_rate=4")  # Try to set to 115200
-            print(f"   [WARNING] Unexpected success: {response}")
+            log.warning("   [WARNING] Unexpected success: %s", response)
             # This should not succeed since manual configuration is disabled
-            board.release_session()
             return False
-            
+
         except BrainFlowError as e:
             if "INVALID_ARGUMENTS_ERROR" in str(e) or "unable to config board" in str(e):
-                print("   [SUCCESS] Correctly rejects manual configuration (as expected)")
-                print(f"   Error: {e}")
+                log.info("   [SUCCESS] Correctly rejects manual configuration (as expected)")
+                log.info("   Error: %s", e)
             else:
-                print(f"   [ERROR] Unexpected error type: {e}")
-                board.release_session()
+                log.error("   [ERROR] Unexpected error type: %s", e)
                 return False
-        
-        board.release_session()
-        
+
     except Exception as e:
-        print(f"[ERROR] ERROR: {e}")
+        log.error("[ERROR] ERROR: %s", e)
         return False
-    
+
     return True
 
 
+def run():
+    """In-process entry point for run_all_tests."""
+    # The values test is pure dict iteration, no hardware needed
+    config_success = test_baud_rate_configuration_values()
+    try:
+        with managed_board(BoardIds.CERELOG_X8_BOARD, BrainFlowInputParams()) as board:
+            success = test_dynamic_baud_rate_configuration(board)
+            manual_success = test_manual_configuration_disabled(board)
+    except Exception as e:
+        log.error("[ERROR] ERROR: %s", e)
+        return False
+    return success and config_success and manual_success
+
 if __name__ == "__main__":
-    print("Cerelog X8 Dynamic Baud Rate Configuration Test")
-    print("===============================================")
-    print("")
-    
-    # Run the main test
-    success = test_dynamic_baud_rate_configuration()
-    
-    # Run the configuration values test
+    log.info("Cerelog X8 Dynamic Baud Rate Configuration Test")
+    log.info("===============================================")
+    log.info("")
+
+    # Run the configuration values test first (no hardware required)
     config_success = test_baud_rate_configuration_values()
-    
-    # Run the manual configuration test
-    manual_success = test_manual_configuration_disabled()
-    
-    print("\n" + "="*60)
+
+    # Run the hardware tests against one shared prepared session
+    try:
+        with managed_board(BoardIds.CERELOG_X8_BOARD, BrainFlowInputParams()) as board:
+            success = test_dynamic_baud_rate_configuration(board)
+            manual_success = test_manual_configuration_disabled(board)
+    except Exception as e:
+        log.error("[ERROR] ERROR: %s", e)
+        success = manual_success = False
+
+    log.info("\n%s", "="*60)
     if success and config_success and manual_success:
-        print("[SUCCESS] ALL TESTS PASSED!")
-        print("Dynamic baud rate configuration is working correctly.")
-        print("Handshake parameters are being used for baud rate configuration.")
+        log.info("[SUCCESS] ALL TESTS PASSED!")
+        log.info("Dynamic baud rate configuration is working correctly.")
+        log.info("Handshake parameters are being used for baud rate configuration.")
     else:
-        print("[FAILED] SOME TESTS FAILED!")
-        print("Check the output above for details.")
-    
-    sys.exit(0 if success and config_success and manual_success else 1) 
\ No newline at end of file
+        log.info("[FAILED] SOME TESTS FAILED!")
+        log.info("Check the output above for details.")
+
+    sys.exit(0 if success and config_success and manual_success else 1)
@@ -1,21 +1,36 @@
+import logging
 import platform
 import time
 import numpy as np
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError, LogLevels
 import faulthandler
-import csv
 import sys
 faulthandler.enable()
 
-def calculate_rms(signal):
-    return np.sqrt(np.mean(np.square(signal)))
+# Lazy %-style logging: arguments are only formatted if the record is emitted
+logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+log = logging.getLogger(__name__)
 
-def calculate_peak_to_peak(signal):
-    return np.max(signal) - np.min(signal)
+def wait_for_samples(board, n, timeout=10):
+    """Poll the board buffer and return as soon as n samples are ready."""
+    t0 = time.time()
+    while board.get_board_data_count() < n:
+        if time.time() - t0 > timeout:
+            break
+        time.sleep(0.05)
+
+def calculate_rms(signals):
+    """Per-row RMS of a (channels, samples) block in one einsum pass."""
+    signals = np.asarray(signals)
+    return np.sqrt(np.einsum('...j,...j->...', signals, signals) / signals.shape[-1])
+
+def calculate_peak_to_peak(signals):
+    """Per-row peak-to-peak of a (channels, samples) block."""
+    return np.ptp(np.asarray(signals), axis=-1)
 
 def test_my_board():
-    params = BrainFlowInputParams()    
-    print(f"Using port scanning on {platform.system()} (will auto-detect port)")
+    params = BrainFlowInputParams()
+    log.info("Using port scanning on %s (will auto-detect port)", platform.system())
     
     params.timeout = 10
     time_len = 3       # Collect data for 3 seconds
@@ -26,54 +41,57 @@ def test_my_board():
         BoardShim.set_log_file('test_brainflow.log')
         sample_rate = BoardShim.get_sampling_rate(BoardIds.CERELOG_X8_BOARD)
         eeg_channels = BoardShim.get_eeg_channels(BoardIds.CERELOG_X8_BOARD)
-        print(f"Sample rate  : {sample_rate} SPS")
-        print(f"EEG Channels : {eeg_channels}")
+        log.info("Sample rate  : %d SPS", sample_rate)
+        log.info("EEG Channels : %s", eeg_channels)
 
         board.prepare_session()
-        print("[SUCCESS] Session prepared successfully")
+        log.info("[SUCCESS] Session prepared successfully")
 
         board.start_stream()
-        print("... Stream started for {} seconds".format(time_len))
+        log.info("... Stream started for %d seconds", time_len)
 
-        time.sleep(time_len)  # Collect some data
+        wait_for_samples(board, sample_rate * time_len)  # Returns once enough is buffered
         board.stop_stream()
-        print("Stream time completed")
+        log.info("Stream time completed")
         data = board.get_board_data()
 
-        print(f"Data shape: {data.shape}")
-        print(f"[SUCCESS] Got {data.shape[1]} samples")
+        log.info("Data shape: %s", data.shape)
+        log.info("[SUCCESS] Got %d samples", data.shape[1])
+
+        # Batched channel stats: one contiguous block, one reduction per stat
+        ch_block = np.ascontiguousarray(data[eeg_channels], dtype=np.float64)
 
         # Calculate RMS for each EEG channel
         if data.size > 0:
-            for ch in eeg_channels:
-                ch_data = data[ch]
-                rms = calculate_rms(ch_data)
-                print(f"RMS of EEG channel {ch}: {rms:.4f} V")
+            rms_arr = calculate_rms(ch_block)
+            for ch, rms in zip(eeg_channels, rms_arr):
+                log.info("RMS of EEG channel %s: %.4f V", ch, rms)
 
         # Calculate and print average Vpp of the channels
-        vpp_values = []
-        for ch in eeg_channels:
-            ch_data = data[ch]
-            ptp = calculate_peak_to_peak(ch_data)
-            if ptp >= 0.01:  # Exclude channels with Vpp less than 0.01
-                vpp_values.append(ptp)
-        if vpp_values:
+        ptp_arr = calculate_peak_to_peak(ch_block)
+        vpp_values = ptp_arr[ptp_arr >= 0.01]  # Exclude channels with Vpp less than 0.01
+        if vpp_values.size:
             avg_vpp = np.mean(vpp_values)
-            print(f"Average Vpp of EEG channels: {avg_vpp:.4f} V")
+            log.info("Average Vpp of EEG channels: %.4f V", avg_vpp)
         else:
-            print("No channels with Vpp >= 0.01 to calculate average Vpp.")
-        # Write data to CSV
-        with open('data.csv', mode='w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Time'] + [f"Channel {ch}" for ch in eeg_channels])
-            for i in range(data.shape[1]):
-                writer.writerow([i] + [f"{data[ch][i]:.4f}" for ch in eeg_channels])
+            log.info("No channels with Vpp >= 0.01 to calculate average Vpp.")
+        # Write data to CSV in one bulk np.savetxt call instead of per-sample writerow
+        rows = np.column_stack((np.arange(data.shape[1], dtype=np.int64), ch_block.T))
+        header = "Time," + ",".join(f"Channel {ch}" for ch in eeg_channels)
+        np.savetxt('data.csv', rows, fmt=['%d'] + ['%.4f'] * len(eeg_channels),
+                   delimiter=',', header=header, comments='')
 
         board.release_session()
-        print("[SUCCESS] Done!")
+        log.info("[SUCCESS] Done!")
+        return True
 
     except BrainFlowError as e:
-        print(f"[ERROR] Error: {e}")
+        log.error("[ERROR] Error: %s", e)
+        return False
+
+def run():
+    """In-process entry point for run_all_tests."""
+    return test_my_board()
 
 if __name__ == "__main__":
     test_my_board()
\ No newline at end of file
@@ -17,7 +17,10 @@ successful behavior of the C++ driver by:
 This test should PASS when run by itself if the hardware and firmware are correct.
 """
 
+import os
 import platform
+import numpy as np
+import selectors
 import serial
 import serial.tools.list_ports
 import time
@@ -25,10 +28,73 @@ import sys
 import struct
 from typing import Optional
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # --- Constants ---
 PACKET_TOTAL_SIZE = 37
 START_MARKER_BYTES = b'\xab\xcd'
 
+# Precompiled struct formats: parsed once at import, not per call
+_U32BE = struct.Struct('>I')
+
+def enable_low_latency(ser) -> None:
+    """Put the USB-serial bridge into low-latency mode (best effort).
+
+    FTDI-style adapters default to a 16 ms latency timer that batches the
+    500 Hz 37-byte packets into bursts; this asks the driver to post USB
+    reads every ~1 ms instead. Silently degrades to a warning on platforms
+    or drivers that do not support it.
+    """
+    try:
+        system = platform.system()
+        if system == 'Linux':
+            import array
+            import fcntl
+            TIOCGSERIAL, TIOCSSERIAL = 0x541E, 0x541F
+            ASYNC_LOW_LATENCY = 1 << 13
+            buf = array.array('i', [0] * 64)
+            fcntl.ioctl(ser.fileno(), TIOCGSERIAL, buf)
+            buf[4] |= ASYNC_LOW_LATENCY  # serial_struct.flags
+            fcntl.ioctl(ser.fileno(), TIOCSSERIAL, buf)
+            print("[INFO] Enabled ASYNC_LOW_LATENCY on the port")
+        elif system == 'Darwin':
+            import fcntl
+            IOSSDATALAT = 0x80085400  # _IOW('T', 0, unsigned long), microseconds
+            fcntl.ioctl(ser.fileno(), IOSSDATALAT, struct.pack('Q', 1000))
+            print("[INFO] Set driver data latency to 1 ms")
+        elif system == 'Windows':
+            # Default driver input buffer is 4 kB; at 921600 baud that is
+            # ~35 ms of data, easily overrun during a GC pause
+            ser.set_buffer_size(rx_size=65536, tx_size=4096)
+            print("[INFO] Grew the driver receive buffer to 64 kB")
+    except Exception as e:
+        print(f"[WARN] Could not enable low-latency mode: {e}")
+
+def tune_read_batching(ser) -> None:
+    """Ask the tty layer to wake readers only when a full packet is ready.
+
+    pyserial leaves VMIN=0/VTIME=0, so the fd is marked readable on the
+    first byte and each wakeup delivers a dribble. Raising VMIN to one
+    packet (with VTIME=1 as a 100 ms escape hatch) makes the readiness
+    wait and blocking reads return whole packets, so the vectorized parse
+    kernels see real batches. POSIX only; best effort. The Windows
+    equivalent (growing the driver buffer) lives in enable_low_latency.
+    """
+    if os.name != 'posix':
+        return
+    try:
+        import termios
+        attrs = termios.tcgetattr(ser.fileno())
+        attrs[6][termios.VMIN] = PACKET_TOTAL_SIZE
+        attrs[6][termios.VTIME] = 1
+        termios.tcsetattr(ser.fileno(), termios.TCSANOW, attrs)
+        print(f"[INFO] Raised tty read threshold to one packet (VMIN={PACKET_TOTAL_SIZE})")
+    except Exception as e:
+        print(f"[WARN] Could not tune tty read batching: {e}")
+
 def find_serial_port() -> Optional[str]:
     """Scans for and returns the most likely serial port."""
     ports = list(serial.tools.list_ports.comports())
@@ -47,40 +113,155 @@ def find_serial_port() -> Optional[str]:
         
     return None
 
-def create_handshake_packet(baud_config_val: int) -> bytes:
-    """Creates the 12-byte handshake packet with the mathematically correct checksum."""
-    packet = bytearray(12)
+# Handshake frame with the constant bytes prefilled:
+# [start AA BB][msg type 02][4B timestamp][reg_addr][reg_val][checksum][end CC DD]
+_HANDSHAKE_TEMPLATE = bytearray(b'\xaa\xbb\x02\x00\x00\x00\x00\x00\x00\x00\xcc\xdd')
+
+def create_handshake_packet(baud_config_val: int, reg_addr: int = 0x01) -> bytes:
+    """Creates the 12-byte handshake packet with the mathematically correct checksum.
+
+    Shared by test_handshake as well, so the frame is built in exactly one
+    place.
+    """
+    packet = _HANDSHAKE_TEMPLATE[:]
     timestamp = int(time.time())
+    if timestamp < 1600000000:
+        timestamp = 1500000000  # fallback timestamp
 
-    packet[0] = 0xAA
-    packet[1] = 0xBB
-    packet[2] = 0x02 # Message Type: Timestamp
-    
-    packet[3:7] = struct.pack('>I', timestamp) # Timestamp (4 bytes, Big Endian)
-    
-    packet[7] = 0x01  # Register Address: Baud Rate
+    _U32BE.pack_into(packet, 3, timestamp) # Timestamp (4 bytes, Big Endian)
+
+    packet[7] = reg_addr  # Register Address (0x01 = Baud Rate)
     packet[8] = baud_config_val
-    
-    # The correct checksum is the sum of bytes from index 2 up to (not including) 9
-    packet[9] = sum(packet[2:9]) & 0xFF
-    
-    packet[10] = 0xCC
-    packet[11] = 0xDD
-    
+
+    # The correct checksum is the sum of bytes from index 2 up to (not including) 9;
+    # summing a memoryview avoids copying the slice
+    packet[9] = sum(memoryview(packet)[2:9]) & 0xFF
+
     return bytes(packet)
 
-def verify_packet(packet: bytes) -> bool:
-    """Verifies a 37-byte chunk for checksum and end marker."""
+# 37-byte data packet layout: [0:2] start marker, [2] length, [3:7] timestamp,
+# [7:34] ADS1299 frame (3 status bytes + 8 channels x 3 bytes), [34] checksum,
+# [35:37] end marker
+_HEADER = struct.Struct('>HBI')
+PACKET_IDX_ADS1299_DATA = 7
+ADS1299_VREF = 4.5
+ADS1299_GAIN = 24
+CHANNEL_SCALE = (2.0 * ADS1299_VREF / ADS1299_GAIN) / (1 << 24)
+_CH_SCALE_F32 = np.float32(CHANNEL_SCALE)
+
+def decode_channels(ads24) -> np.ndarray:
+    """Vectorized decode of 24 bytes (8 channels x 3 bytes, big-endian signed).
+
+    The << 24 ... >> 8 round trip sign-extends the 24-bit values inside
+    int32 vector ops; one numpy pass replaces eight Python conversions.
+    """
+    b = np.frombuffer(ads24, dtype=np.uint8).reshape(8, 3).astype(np.int32)
+    val = (b[:, 0] << 24 | b[:, 1] << 16 | b[:, 2] << 8) >> 8
+    return val.astype(np.float32) * _CH_SCALE_F32
+
+def parse_packet(data):
+    """Decodes a verified 37-byte packet (bytes or memoryview) into (timestamp, 8 channel volts)."""
+    _start, _length, timestamp = _HEADER.unpack_from(data, 0)
+    ads = data[PACKET_IDX_ADS1299_DATA + 3 : PACKET_IDX_ADS1299_DATA + 27]
+    return timestamp, decode_channels(ads)
+
+def _parse_block(buf, head, out_ts, out_ch, n, scale):
+    """Verify and decode every complete packet in buf, starting at head.
+
+    One pass over a uint8 view: marker scan, checksum, timestamp and
+    24-bit channel decode without any intermediate slices. Returns the
+    advanced (head, count); valid packets beyond the output capacity are
+    counted but not stored.
+    """
+    total = len(buf)
+    while True:
+        i = head
+        while i + 1 < total and not (buf[i] == 0xAB and buf[i + 1] == 0xCD):
+            i += 1
+        if i + 1 >= total:
+            return head, n  # No marker yet: rescan the tail next round
+        if total - i < PACKET_TOTAL_SIZE:
+            return i, n     # Partial packet: resume at the marker
+        ok = buf[i + 35] == 0xDC and buf[i + 36] == 0xBA
+        if ok:
+            cs = 0
+            for j in range(i + 2, i + 34):
+                cs += int(buf[j])
+            ok = (cs & 0xFF) == buf[i + 34]
+        if ok:
+            if n < out_ts.shape[0]:
+                out_ts[n] = ((int(buf[i + 3]) << 24) | (int(buf[i + 4]) << 16)
+                             | (int(buf[i + 5]) << 8) | int(buf[i + 6]))
+                for c in range(8):
+                    base = i + PACKET_IDX_ADS1299_DATA + 3 + c * 3
+                    v = (int(buf[base]) << 16) | (int(buf[base + 1]) << 8) | int(buf[base + 2])
+                    # Branchless 24-bit sign extension: EEG signs flip
+                    # constantly, so a conditional here mispredicts
+                    v -= (v & 0x800000) << 1
+                    out_ch[n, c] = v * scale
+            n += 1
+            head = i + PACKET_TOTAL_SIZE
+        else:
+            head = i + 1
+
+# The interpreted fallback keeps the find/memoryview path below; the scan
+# loop is only worth it compiled
+_parse_block_nb = njit(cache=True, boundscheck=False)(_parse_block) if njit is not None else None
+
+def _parse_block_numpy(buffer, head, out_ts, out_ch, n):
+    """Batch fallback parser: validate and decode aligned packets in bulk.
+
+    Views the buffered packets as a (batch, 37) uint8 matrix, checks
+    markers and checksums with vector compares, and decodes timestamps
+    and channels for the whole batch in one pass. Stops at the first
+    invalid row; the scalar loop resyncs past corruption. Returns
+    (head, count, clean) where clean is False when corruption was seen.
+    """
+    start = buffer.find(START_MARKER_BYTES, head)
+    if start < 0:
+        return head, n, True
+    count = (len(buffer) - start) // PACKET_TOTAL_SIZE
+    if count == 0:
+        return start, n, True
+    arr = np.frombuffer(buffer, dtype=np.uint8, offset=start,
+                        count=count * PACKET_TOTAL_SIZE).reshape(count, PACKET_TOTAL_SIZE)
+    valid = ((arr[:, 0] == 0xAB) & (arr[:, 1] == 0xCD)
+             & (arr[:, 35] == 0xDC) & (arr[:, 36] == 0xBA)
+             & ((arr[:, 2:34].sum(axis=1) & 0xFF) == arr[:, 34]))
+    if valid.all():
+        good, clean = count, True
+    else:
+        good, clean = int(np.argmin(valid)), False  # First invalid row
+    if good == 0:
+        return start, n, clean
+    stored = min(good, out_ts.shape[0] - n)
+    if stored > 0:
+        sub = arr[:stored]
+        ts = sub[:, 3:7].astype(np.uint32)
+        out_ts[n:n + stored] = (ts[:, 0] << 24) | (ts[:, 1] << 16) | (ts[:, 2] << 8) | ts[:, 3]
+        b = sub[:, PACKET_IDX_ADS1299_DATA + 3 : PACKET_IDX_ADS1299_DATA + 27]
+        b = b.reshape(stored, 8, 3).astype(np.int32)
+        vals = (b[:, :, 0] << 16) | (b[:, :, 1] << 8) | b[:, :, 2]
+        vals -= (vals & 0x800000) << 1  # 24-bit sign extension
+        out_ch[n:n + stored] = vals.astype(np.float32) * _CH_SCALE_F32
+    return start + good * PACKET_TOTAL_SIZE, n + good, clean
+
+def verify_packet(packet) -> bool:
+    """Verifies a 37-byte chunk (bytes or memoryview) for checksum and end marker."""
     if len(packet) != PACKET_TOTAL_SIZE: return False
-    if packet[35:37] != b'\xdc\xba': return False # Check End Marker
-    calculated_checksum = sum(packet[2:34]) & 0xFF
-    received_checksum = packet[34]
-    return calculated_checksum == received_checksum
+    mv = memoryview(packet)
+    if mv[35:37] != b'\xdc\xba': return False # End marker compare is a C memcmp
+    return (sum(mv[2:34]) & 0xFF) == mv[34]
 
-def run_standalone_diagnostic():
+def run_standalone_diagnostic(target_baud=115200, baud_config_val=0x04,
+                              boot_wait=5.0, listen_time=5.0):
     """
     Runs the full diagnostic test, incorporating the robust connection logic
     discovered during C++ driver development for macOS compatibility.
+
+    Connection variants are plain parameters (see STRATEGIES) so alternate
+    baud/boot timings share this one body instead of living in edited
+    copies of the script.
     """
     port_name = find_serial_port()
     if not port_name:
@@ -88,16 +269,16 @@ def run_standalone_diagnostic():
         return False
 
     ser = None # Initialize ser to None for the finally block
+    sel = None
     try:
         # --- Step 1: Connect, WAIT, and Send Handshake at 9600 ---
         print("\n--- STEP 1: Initial Connection & Handshake ---")
         print(f"[INFO] Opening port {port_name} at 9600 baud...")
         ser = serial.Serial(port_name, 9600, timeout=1.0)
-        print("[INFO] Port opened. Waiting 5 seconds for board to reset and boot...")
-        time.sleep(5)
+        print(f"[INFO] Port opened. Waiting {boot_wait:.0f} seconds for board to reset and boot...")
+        time.sleep(boot_wait)
 
-        target_baud_rate = 115200
-        baud_config_val = 0x04
+        target_baud_rate = target_baud
         handshake_packet = create_handshake_packet(baud_config_val)
         
         print(f"[INFO] Sending handshake to switch device to {target_baud_rate} baud...")
@@ -121,39 +302,112 @@ def run_standalone_diagnostic():
 
         print(f"[INFO] Re-opening port at new speed: {target_baud_rate} baud...")
         ser = serial.Serial(port_name, target_baud_rate, timeout=1.0)
+        enable_low_latency(ser)
         ser.reset_input_buffer()
         print("[PASS] Host is now listening at high speed.")
 
         # --- Step 3: Validate High-Speed Data ---
         print("\n--- STEP 3: Validating High-Speed Data Stream ---")
+        # Consumed bytes are tracked with a head index instead of reslicing
+        # the bytearray per packet (each `buffer = buffer[N:]` copies the
+        # whole tail); the buffer is compacted once the dead prefix grows.
         buffer = bytearray()
+        head = 0
         found_packets = 0
-        start_time = time.time()
-        
-        print("[INFO] Listening for data for 5 seconds...")
-        # Main validation loop remains the same
-        while time.time() - start_time < 5:
-            if ser.in_waiting > 0:
-                buffer.extend(ser.read(ser.in_waiting))
-            
-            while True:
-                start_index = buffer.find(START_MARKER_BYTES)
-                if start_index == -1 or len(buffer) < start_index + PACKET_TOTAL_SIZE:
-                    break
-
-                packet = buffer[start_index : start_index + PACKET_TOTAL_SIZE]
-                if verify_packet(packet):
-                    found_packets += 1
-                    if found_packets == 1:
-                        print(f"[SUCCESS] Received first valid high-speed data packet at {time.time() - start_time:.2f}s!")
-                    buffer = buffer[start_index + PACKET_TOTAL_SIZE:]
-                else:
-                    buffer = buffer[start_index + 1:]
+
+        # Preallocated SoA storage for the decoded stream: timestamps and
+        # channels land in flat arrays with zero per-packet allocation
+        max_packets = 8192
+        packet_ts = np.empty(max_packets, dtype=np.uint32)
+        packet_ch = np.empty((max_packets, 8), dtype=np.float32)
+
+        # Reads land in a preallocated scratch via readinto, so no fresh
+        # bytes object is built per poll
+        read_scratch = bytearray(PACKET_TOTAL_SIZE * 16)
+        scratch_mv = memoryview(read_scratch)
+
+        # On POSIX, read the fd directly: one readiness wait plus one
+        # readv() into the scratch per iteration, skipping pyserial's
+        # per-call property and locking machinery. DefaultSelector picks
+        # epoll/kqueue, and registering once avoids rebuilding the fd set
+        # every call the way bare select() does.
+        fd = None
+        if os.name == 'posix':
+            fd = ser.fileno()
+            sel = selectors.DefaultSelector()
+            sel.register(fd, selectors.EVENT_READ)
+
+        monotonic = time.monotonic  # Bound once: no attribute lookup per tick
+        start_time = monotonic()
+        deadline = start_time + listen_time
+
+        print(f"[INFO] Listening for data for {listen_time:.0f} seconds...")
+        # Batched blocking reads: read() returns as soon as at least one byte
+        # is available (the timeout bounds latency), pulling up to 16 packets
+        # per syscall instead of an in_waiting ioctl per iteration
+        ser.timeout = 0.02
+        # Assigning ser.timeout makes pyserial rewrite termios (back to
+        # VMIN=0/VTIME=0), so the packet-sized read threshold must be set
+        # after the last timeout assignment or it is silently undone
+        tune_read_batching(ser)
+        # One clock read per iteration; monotonic is immune to wall-clock jumps
+        now = start_time
+        while now < deadline:
+            now = monotonic()
+            if fd is not None:
+                # Sleep exactly until bytes arrive (capped so the deadline
+                # check still runs), then drain in one readv
+                ready = sel.select(min(deadline - now, 0.02))
+                got = os.readv(fd, [scratch_mv]) if ready else 0
+            else:
+                got = ser.readinto(read_scratch)
+            if got:
+                buffer += scratch_mv[:got]
+
+            first_seen = found_packets == 0
+            if _parse_block_nb is not None:
+                # Compiled path: verify + decode every buffered packet in one call
+                arr = np.frombuffer(buffer, dtype=np.uint8)
+                head, found_packets = _parse_block_nb(
+                    arr, head, packet_ts, packet_ch, found_packets, CHANNEL_SCALE)
+                del arr  # Release the export so extend/compact can resize
+            else:
+                # Bulk-validate and decode everything aligned; the scalar loop
+                # below only runs to resync past corrupted bytes
+                head, found_packets, clean = _parse_block_numpy(
+                    buffer, head, packet_ts, packet_ch, found_packets)
+                while not clean:
+                    start_index = buffer.find(START_MARKER_BYTES, head)
+                    if start_index == -1 or len(buffer) < start_index + PACKET_TOTAL_SIZE:
+                        break
+
+                    packet = memoryview(buffer)[start_index : start_index + PACKET_TOTAL_SIZE]
+                    valid = verify_packet(packet)
+                    if valid and found_packets < max_packets:
+                        # Decode straight into the preallocated arrays
+                        packet_ts[found_packets], packet_ch[found_packets] = parse_packet(packet)
+                    packet.release()  # Drop the export so extend/compact can resize
+
+                    if valid:
+                        found_packets += 1
+                        head = start_index + PACKET_TOTAL_SIZE
+                    else:
+                        head = start_index + 1
+
+            if first_seen and found_packets > 0:
+                print(f"[SUCCESS] Received first valid high-speed data packet at {now - start_time:.2f}s!")
+                print(f"[DATA] timestamp={packet_ts[0]}, ch1={packet_ch[0, 0]*1e6:.2f} uV, ch2={packet_ch[0, 1]*1e6:.2f} uV")
+
+            if head > 4096 or head > len(buffer) // 2:
+                del buffer[:head]
+                head = 0
 
     except serial.SerialException as e:
         print(f"\n[FAIL] A serial port error occurred: {e}")
         return False
     finally:
+        if sel is not None:
+            sel.close()
         if ser and ser.is_open:
             ser.close()
             print("[INFO] Test finished. Serial port closed.")
@@ -162,8 +416,8 @@ def run_standalone_diagnostic():
     print("\n" + "="*40)
     print("=== FINAL RESULTS ===")
     if found_packets > 0:
-        # Measure duration only over the 5-second listening window
-        rate = found_packets / 5.0
+        # Measure duration only over the listening window
+        rate = found_packets / listen_time
         print(f"[SUCCESS] Test PASSED!")
         print(f"   - Found {found_packets} valid packets.")
         print(f"   - Measured data rate: ~{rate:.1f} packets/sec (Expected: ~500)")
@@ -173,8 +427,23 @@ def run_standalone_diagnostic():
         print("   - No valid data packets were received at the high baud rate.")
         return False
 
+def run():
+    """In-process entry point for run_all_tests."""
+    return run_standalone_diagnostic()
+
+# Named parameter sets for run_standalone_diagnostic; pick one with
+# `python test_serial.py --strategy <name>`
+STRATEGIES = {
+    'default': {},
+    'quick-boot': {'boot_wait': 2.0},
+    'hispeed': {'target_baud': 230400, 'baud_config_val': 0x05},
+}
+
 if __name__ == "__main__":
-    if run_standalone_diagnostic():
+    strategy = 'default'
+    if '--strategy' in sys.argv:
+        strategy = sys.argv[sys.argv.index('--strategy') + 1]
+    if run_standalone_diagnostic(**STRATEGIES[strategy]):
         sys.exit(0)
     else:
         sys.exit(1)
\ No newline at end of file
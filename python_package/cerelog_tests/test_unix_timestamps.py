@@ -9,13 +9,43 @@ import os
 import time
 import platform
 import re
-from datetime import datetime
+import numpy as np
+from collections import deque
 
 # Add the parent directory to the path to import Brainflow
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, LogLevels
 
+# The structured log-line shapes in one alternation, compiled once at import:
+# interesting lines cost a single regex pass and the named branch group
+# tells the caller which shape matched
+_COMBINED_RE = re.compile(
+    r"(?P<ts>Packet #(?P<pkt>\d+): board_timestamp=(?P<bts>[\d.]+), "
+    r"system_time=(?P<sts>[\d.]+), diff=(?P<diff>[-\d.]+)s)"
+    # Timestamp channel data: only existence is tested, so no captures and
+    # a single lazy gap — two greedy .* runs with captures backtrack
+    # quadratically on long lines
+    r"|(?P<samp>Sample #\d+.*?ch\d+=[\d.\-]+)"
+)
+
+_fmt_sec = None
+_fmt_str = ''
+
+def _fmt_hms(ts):
+    """Format an epoch timestamp as HH:MM:SS, caching per whole second.
+
+    Consecutive log entries usually share a second, so the libc
+    localtime/strftime pair runs once per second of log instead of twice
+    per matched line, and no datetime wrapper object is allocated.
+    """
+    global _fmt_sec, _fmt_str
+    sec = int(ts)
+    if sec != _fmt_sec:
+        _fmt_str = time.strftime('%H:%M:%S', time.localtime(sec))
+        _fmt_sec = sec
+    return _fmt_str
+
 def analyze_timestamp_logs(log_file):
     """Parse log file for timestamp debugging information"""
     
@@ -26,76 +56,74 @@ def analyze_timestamp_logs(log_file):
     print(f"[INFO] Analyzing timestamp logs from: {log_file}")
     print("=" * 60)
     
-    timestamp_patterns = [
-        r"Packet #(\d+): board_timestamp=([\d.]+), system_time=([\d.]+), diff=([-\d.]+)s",
-        r"Using scanned port for (\w+): (.+)",
-        r"Found available port: (.+)",
-        r"Sample #(\d+).*ch(\d+)=([\d.-]+).*ch(\d+)=([\d.-]+)"  # Timestamp channel data (RegEx)
-    ]
-    
     found_timestamps = []
     found_ports = []
-    found_samples = []
+    # Only the most recent 3 samples are ever displayed, so a bounded
+    # deque keeps sample accumulation O(1) regardless of log size
+    found_samples = deque(maxlen=3)
     
     try:
-        with open(log_file, 'r') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                
-                # Look for timestamp debugging messages
-                for pattern in timestamp_patterns:
-                    match = re.search(pattern, line)
-                    if match:
-                        if "board_timestamp" in line:
-                            packet_num = int(match.group(1))
-                            board_ts = float(match.group(2))
-                            system_ts = float(match.group(3))
-                            diff = float(match.group(4))
-                            
-                            found_timestamps.append({
-                                'packet': packet_num,
-                                'board_ts': board_ts,
-                                'system_ts': system_ts,
-                                'diff': diff,
-                                'line': line_num
-                            })
-                        elif "scanned port" in line or "Found available port" in line:
-                            found_ports.append({
-                                'message': line,
-                                'line': line_num
-                            })
-                        elif "Sample #" in line and "ch" in line:
-                            found_samples.append({
-                                'message': line,
-                                'line': line_num
-                            })
+        # One large sequential read and a single split: the per-line
+        # readline machinery costs more than scanning these logs does
+        with open(log_file, 'r', buffering=1 << 20) as f:
+            content = f.read()
+        for line_num, line in enumerate(content.split('\n'), 1):
+            line = line.strip()
+
+            # Port lines carry no fields to extract, only the literal; a
+            # plain substring check is enough, no regex engine needed
+            if "Using scanned port for " in line or "Found available port: " in line:
+                found_ports.append({
+                    'message': line,
+                    'line': line_num
+                })
+                continue
+
+            # A cheap substring guard skips uninteresting lines, then one
+            # combined-regex pass classifies the rest via its named branch
+            if "board_timestamp=" not in line and "Sample #" not in line:
+                continue
+            match = _COMBINED_RE.search(line)
+            if not match:
+                continue
+
+            if match['ts'] is not None:
+                found_timestamps.append({
+                    'packet': int(match['pkt']),
+                    'board_ts': float(match['bts']),
+                    'system_ts': float(match['sts']),
+                    'diff': float(match['diff']),
+                    'line': line_num
+                })
+            else:
+                found_samples.append({
+                    'message': line,
+                    'line': line_num
+                })
     
         # Display results
+        # Each section is joined into one string and emitted with a single
+        # print, so the report costs one stream write per section instead
+        # of one per matched line
         if found_timestamps:
-            print("[DEBUG] TIMESTAMP DEBUGGING INFO:")
-            print("-" * 40)
+            lines = ["[DEBUG] TIMESTAMP DEBUGGING INFO:", "-" * 40]
             for ts_info in found_timestamps:
-                board_dt = datetime.fromtimestamp(ts_info['board_ts'])
-                system_dt = datetime.fromtimestamp(ts_info['system_ts'])
-                
-                print(f"Packet {ts_info['packet']}:")
-                print(f"  Board:    {ts_info['board_ts']:.2f} -> {board_dt.strftime('%H:%M:%S')}")
-                print(f"  System:   {ts_info['system_ts']:.2f} -> {system_dt.strftime('%H:%M:%S')}")
-                print(f"  Diff:     {ts_info['diff']:.2f}s\n")
-        
+                lines.append(f"Packet {ts_info['packet']}:")
+                lines.append(f"  Board:    {ts_info['board_ts']:.2f} -> {_fmt_hms(ts_info['board_ts'])}")
+                lines.append(f"  System:   {ts_info['system_ts']:.2f} -> {_fmt_hms(ts_info['system_ts'])}")
+                lines.append(f"  Diff:     {ts_info['diff']:.2f}s\n")
+            print('\n'.join(lines))
+
         if found_ports:
-            print("[PORT] PORT DETECTION INFO:")
-            print("-" * 40)
-            for port_info in found_ports:
-                print(f"Line {port_info['line']}: {port_info['message']}")
-            print("")
-        
+            print('\n'.join(["[PORT] PORT DETECTION INFO:", "-" * 40]
+                            + [f"Line {p['line']}: {p['message']}" for p in found_ports])
+                  + "\n")
+
         if found_samples:
-            print("[DATA] SAMPLE DATA (most recent 3):")
-            print("-" * 40)
-            for sample_info in found_samples[-3:]:  # Show last 3 instead of first 3
-                print(f"Line {sample_info['line']}: {sample_info['message']}")
-            print("")
+            # deque(maxlen=3) already holds the last 3
+            print('\n'.join(["[DATA] SAMPLE DATA (most recent 3):", "-" * 40]
+                            + [f"Line {s['line']}: {s['message']}" for s in found_samples])
+                  + "\n")
         
         if not found_timestamps and not found_ports and not found_samples:
             print("[ERROR] No timestamp debugging information found in log")
@@ -158,28 +186,32 @@ def test_unix_timestamps():
             print("[TIMESTAMP] TIMESTAMP ANALYSIS:")
             print("-" * 40)
             
-            # Show first few timestamps
-            print("First 5 timestamps:")
-            for i in range(min(5, len(timestamps))):
-                timestamp = timestamps[i]
-                if timestamp > 0:  # Valid timestamp
-                    dt = datetime.fromtimestamp(timestamp)
-                    print(f"  Sample {i}: {timestamp:.2f} -> {dt.strftime('%Y-%m-%d %H:%M:%S')}")
-                else:
-                    print(f"  Sample {i}: {timestamp:.2f} (invalid)")
-            
+            # Show first few timestamps: format in one pass with C-level
+            # time.strftime (no datetime allocation) and emit one print
+            preview = [
+                f"  Sample {i}: {t:.2f} -> "
+                + time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(t)))
+                if t > 0 else f"  Sample {i}: {t:.2f} (invalid)"
+                for i, t in enumerate(timestamps[:5])
+            ]
+            print("First 5 timestamps:\n" + '\n'.join(preview))
+
             print("")
             
-            # Show timestamp progression
-            valid_timestamps = [t for t in timestamps if t > 0]
-            if len(valid_timestamps) >= 2:
-                first_ts = valid_timestamps[0]
-                last_ts = valid_timestamps[-1]
+            # Show timestamp progression; only the first/last valid samples
+            # are used, so locate them with argmax scans over the mask
+            # instead of materializing a filtered copy of the array
+            valid_mask = timestamps > 0
+            n_valid = int(np.count_nonzero(valid_mask))
+            if n_valid > 0:
+                last_ts = float(timestamps[len(timestamps) - 1 - int(np.argmax(valid_mask[::-1]))])
+            if n_valid >= 2:
+                first_ts = float(timestamps[int(np.argmax(valid_mask))])
                 duration = last_ts - first_ts
                 
                 print(f"[STATS] Timestamp Statistics:")
-                print(f"  First timestamp: {first_ts:.2f} ({datetime.fromtimestamp(first_ts).strftime('%H:%M:%S')})")
-                print(f"  Last timestamp:  {last_ts:.2f} ({datetime.fromtimestamp(last_ts).strftime('%H:%M:%S')})")
+                print(f"  First timestamp: {first_ts:.2f} ({_fmt_hms(first_ts)})")
+                print(f"  Last timestamp:  {last_ts:.2f} ({_fmt_hms(last_ts)})")
                 print(f"  Duration:        {duration:.2f} seconds")
                 print(f"  Expected:        {time_len} seconds")
                 print(f"  Difference:      {abs(duration - time_len):.2f} seconds")
@@ -187,7 +219,7 @@ def test_unix_timestamps():
                 # Check if timestamps are incrementing (old) or Unix (new)
                 if first_ts > 1700000000:  # If first timestamp is a large Unix timestamp (after 2023)
                     print(f"  [SUCCESS] Detected: Unix timestamps (real time)")
-                    print(f"  [INFO] Format: Unix epoch seconds (e.g., {first_ts:.0f} = {datetime.fromtimestamp(first_ts).strftime('%Y-%m-%d %H:%M:%S')})")
+                    print(f"  [INFO] Format: Unix epoch seconds (e.g., {first_ts:.0f} = {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(first_ts)))})")
                 else:
                     print(f"  [WARNING] Detected: Incrementing timestamps (counter)")
                     print(f"  [INFO] Format: Packet counter (e.g., {first_ts:.0f} = packet #{first_ts:.0f})")
@@ -212,10 +244,10 @@ def test_unix_timestamps():
             
             # Show system time comparison
             system_time = time.time()
-            print(f"[SYSTEM] System time: {system_time:.2f} ({datetime.fromtimestamp(system_time).strftime('%H:%M:%S')})")
+            print(f"[SYSTEM] System time: {system_time:.2f} ({_fmt_hms(system_time)})")
             
-            if len(valid_timestamps) > 0:
-                latest_board_time = valid_timestamps[-1]
+            if n_valid > 0:
+                latest_board_time = last_ts
                 time_diff = system_time - latest_board_time
                 print(f"[TIME] Time difference (system - board): {time_diff:.2f} seconds")
                 
@@ -242,6 +274,10 @@ def test_unix_timestamps():
     
     return True
 
+def run():
+    """In-process entry point for run_all_tests."""
+    return test_unix_timestamps()
+
 if __name__ == "__main__":
     print("[TEST] Cerelog X8 Unix Timestamp Test")
     print("=" * 40)
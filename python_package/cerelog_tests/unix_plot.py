@@ -1,9 +1,15 @@
+import threading
 import time
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BoardIds, BrainFlowError
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # --- Configuration ---
 BOARD_ID = BoardIds.CERELOG_X8_BOARD
 SECONDS_TO_DISPLAY = 10
@@ -16,16 +22,133 @@ eeg_channels = []
 timestamp_channel = -1
 sampling_rate = 0
 window_size = 0
-data_buffer = np.array([])
 y_limits = {}
+# Limits actually applied to each axis, so steady frames can skip set_ylim
+applied_ylim = {}
+# Cached EEG row selector: a contiguous channel range indexes as a
+# zero-copy slice; otherwise an intp array beats re-converting the list
+eeg_selector = None
 start_time = 0.0 # This will hold the timestamp of the very first sample
 
+# Fixed-size ring buffers. np.hstack((buffer, new)) reallocates and copies
+# the whole buffer every frame; here writes wrap in place and steady-state
+# allocation is zero. The waveform ring is float32 and already scaled to uV
+# at ingest, halving the bytes every per-frame op moves; the timestamp ring
+# stays float64 because epoch seconds do not fit float32's mantissa.
+eeg_ring = None
+ts_ring = None
+buffer_limit = 0
+write_idx = 0
+samples_filled = 0
+eeg_scratch = None
+ts_scratch = None
+# Persistent destination for the demeaned window, so centering writes
+# into preallocated storage instead of allocating 8 arrays per frame
+centered_scratch = None
+
+# Acquisition runs on its own thread so a slow Matplotlib draw never lets
+# samples pile up in BrainFlow's buffer; the GUI timer only reads the ring.
+ACQ_POLL_INTERVAL_S = 0.02
+ring_lock = threading.Lock()
+acq_stop = threading.Event()
+# Busy guard for update_plot: if the previous frame is still being
+# processed, the new tick returns immediately instead of queueing up
+_busy = threading.Lock()
+
+
+def acquisition_loop():
+    """Drain the board into the ring every ~20 ms on a daemon thread."""
+    global start_time
+    while not acq_stop.is_set():
+        try:
+            if board.get_board_data_count() > 0:
+                new_data = board.get_board_data()
+                if new_data.shape[1] > 0:
+                    with ring_lock:
+                        ring_write(new_data)
+                        if start_time == 0.0:
+                            start_time = new_data[timestamp_channel, 0]
+        except BrainFlowError as e:
+            if not acq_stop.is_set():
+                print(f"!!! ERROR IN ACQUISITION: {e}")
+            break
+        time.sleep(ACQ_POLL_INTERVAL_S)
+
+
+def _channel_stats(x):
+    """Mean and extrema of one channel window in a single sweep.
+
+    Replaces the separate np.mean/np.max/np.min passes per channel per
+    frame; compiled with numba when it is installed.
+    """
+    s = 0.0
+    mn = x[0]
+    mx = x[0]
+    for k in range(x.shape[0]):
+        v = x[k]
+        s += v
+        if v < mn:
+            mn = v
+        elif v > mx:
+            mx = v
+    return s / x.shape[0], mn, mx
+
+_channel_stats_nb = njit(cache=True, fastmath=True)(_channel_stats) if njit is not None else None
+
+
+def ring_write(new_data):
+    """Scale the new EEG samples to uV and copy the chunk into the rings."""
+    global write_idx, samples_filled
+    eeg = new_data[eeg_selector] * 1e6  # chunk-sized temp only
+    ts = new_data[timestamp_channel]
+    k = ts.shape[0]
+    if k >= buffer_limit:
+        eeg_ring[:] = eeg[:, -buffer_limit:]
+        ts_ring[:] = ts[-buffer_limit:]
+        write_idx = 0
+        samples_filled = buffer_limit
+        return
+    end = write_idx + k
+    if end <= buffer_limit:
+        eeg_ring[:, write_idx:end] = eeg
+        ts_ring[write_idx:end] = ts
+    else:
+        first = buffer_limit - write_idx
+        eeg_ring[:, write_idx:] = eeg[:, :first]
+        ts_ring[write_idx:] = ts[:first]
+        eeg_ring[:, :end - buffer_limit] = eeg[:, first:]
+        ts_ring[:end - buffer_limit] = ts[first:]
+    write_idx = end % buffer_limit
+    samples_filled = min(samples_filled + k, buffer_limit)
+
+
+def ring_window():
+    """Return (eeg_uv, timestamps) for the newest displayable samples.
+
+    Contiguous spans come back as views; a wrapped window is assembled
+    into the preallocated scratch buffers.
+    """
+    if samples_filled < window_size:
+        # The rings cannot have wrapped yet, so the data is a prefix
+        return eeg_ring[:, :samples_filled], ts_ring[:samples_filled]
+    if write_idx >= window_size:
+        lo = write_idx - window_size
+        return eeg_ring[:, lo:write_idx], ts_ring[lo:write_idx]
+    tail = window_size - write_idx
+    eeg_scratch[:, :tail] = eeg_ring[:, -tail:]
+    eeg_scratch[:, tail:] = eeg_ring[:, :write_idx]
+    ts_scratch[:tail] = ts_ring[-tail:]
+    ts_scratch[tail:] = ts_ring[:write_idx]
+    return eeg_scratch, ts_scratch
+
 def main():
     """
     Connects to the Cerelog board and creates a robust, real-time, scrolling plot
     that uses the REAL board timestamps for the X-axis.
     """
-    global board, eeg_channels, timestamp_channel, sampling_rate, window_size, data_buffer, y_limits, start_time
+    global board, eeg_channels, timestamp_channel, sampling_rate, window_size, y_limits, start_time
+    global eeg_ring, ts_ring, buffer_limit, eeg_scratch, ts_scratch, eeg_selector
+    global centered_scratch
 
     params = BrainFlowInputParams()
     params.timeout = 15
@@ -39,6 +162,12 @@ def main():
 
         for i in range(len(eeg_channels)):
             y_limits[i] = (-100, 100)
+            applied_ylim[i] = (-100, 100)
+
+        if list(eeg_channels) == list(range(eeg_channels[0], eeg_channels[-1] + 1)):
+            eeg_selector = slice(eeg_channels[0], eeg_channels[-1] + 1)
+        else:
+            eeg_selector = np.asarray(eeg_channels, dtype=np.intp)
 
         print(f"Connecting to {board.get_board_descr(BOARD_ID)['name']}...")
         board.prepare_session()
@@ -50,31 +179,49 @@ def main():
 
         time.sleep(2)
 
+        # Allocate the rings once; twice the display window gives the same
+        # retention the old trim-at-2x-window logic had
+        buffer_limit = int(window_size * 2)
+        eeg_ring = np.empty((len(eeg_channels), buffer_limit), dtype=np.float32)
+        ts_ring = np.empty(buffer_limit)
+        eeg_scratch = np.empty((len(eeg_channels), window_size), dtype=np.float32)
+        ts_scratch = np.empty(window_size)
+        centered_scratch = np.empty((len(eeg_channels), window_size), dtype=np.float32)
+
         initial_data = board.get_board_data()
         if initial_data.shape[1] > 0:
-            data_buffer = initial_data
-            start_time = data_buffer[timestamp_channel, 0]
-        else:
-            num_board_channels = BoardShim.get_num_rows(BOARD_ID)
-            data_buffer = np.empty((num_board_channels, 0))
+            ring_write(initial_data)
+            start_time = initial_data[timestamp_channel, 0]
 
 
         # --- Plot Setup ---
         fig, axes = plt.subplots(4, 2, figsize=(18, 10), sharex=True)
         fig.suptitle('Real-Time Cerelog EEG Waveforms (Correct Scaling)', fontsize=16)
         axes_flat = axes.flatten()
-        lines = [ax.plot([], [], lw=1)[0] for ax in axes_flat]
+        # animated=True keeps the lines out of the regular draw tree, so a
+        # blit pass re-renders only the 8 Line2D artists
+        lines = [ax.plot([], [], lw=1, animated=True)[0] for ax in axes_flat]
 
         for i, ax in enumerate(axes_flat):
             ax.set_title(f'Channel {eeg_channels[i]}')
             ax.set_ylabel('Voltage (µV)')
             ax.grid(True)
+            # Fixed x-limits are what make blitting viable: the window
+            # scrolls by re-basing the data on the newest timestamp, not
+            # by moving the axis every frame
+            ax.set_xlim(-SECONDS_TO_DISPLAY, 0)
 
-        fig.text(0.5, 0.04, 'Time (Seconds since start)', ha='center', va='center')
+        fig.text(0.5, 0.04, 'Time (Seconds, 0 = newest sample)', ha='center', va='center')
         plt.tight_layout(rect=[0, 0.05, 1, 0.96])
 
+        # From here on, only the background thread touches the board API
+        acq_thread = threading.Thread(target=acquisition_loop, daemon=True)
+        acq_thread.start()
+
         def on_close(event):
             print("Plot window closed, stopping stream...")
+            acq_stop.set()
+            acq_thread.join(timeout=1.0)
             if board and board.is_prepared():
                 board.stop_stream()
                 board.release_session()
@@ -82,7 +229,12 @@ def main():
 
         fig.canvas.mpl_connect('close_event', on_close)
 
-        ani = FuncAnimation(fig, update_plot, fargs=(lines, axes_flat), interval=UPDATE_INTERVAL_MS, blit=False)
+        # blit=True restores the cached background and redraws only the
+        # returned line artists instead of re-rendering the whole 4x2 figure
+        # cache_frame_data=False / save_count=0: frames are never saved, so
+        # there is nothing worth caching and no queue to grow under load
+        ani = FuncAnimation(fig, update_plot, fargs=(lines, axes_flat), interval=UPDATE_INTERVAL_MS,
+                            blit=True, cache_frame_data=False, save_count=0)
         plt.show()
 
     except Exception as e:
@@ -95,68 +247,87 @@ def update_plot(frame, lines, axes):
     """
     This function is called periodically to update the plot data.
     """
-    global data_buffer, y_limits, start_time
+    global y_limits
+
+    # If the previous invocation is still running, skip this tick entirely
+    # rather than letting late frames pile up behind it
+    if not _busy.acquire(blocking=False):
+        return lines
 
     try:
-        new_data = board.get_board_data()
-        if new_data.shape[1] == 0:
-            return lines
+        # The acquisition thread owns the board API; this callback only
+        # reads the ring. The lock spans the window read and the per-channel
+        # centering so a concurrent ring_write cannot tear the drawn frame.
+        with ring_lock:
+            if samples_filled < 2:
+                return lines
 
-        data_buffer = np.hstack((data_buffer, new_data))
+            # The ring already holds the EEG rows scaled to microvolts
+            # (the board returns Volts; ring_write multiplies by 1e6 once,
+            # at ingest, instead of rescaling the whole window every frame)
+            eeg_plot_data, timestamps = ring_window()
 
-        buffer_limit = int(window_size * 2)
-        if data_buffer.shape[1] > buffer_limit:
-            data_buffer = data_buffer[:, -buffer_limit:]
-            
-        if start_time == 0.0 and data_buffer.shape[1] > 0:
-            start_time = data_buffer[timestamp_channel, 0]
-            return lines
-
-        plot_data = data_buffer[:, -window_size:]
-        
-        if plot_data.shape[1] < 2:
-            return lines
-
-        # --- VERTICAL SCALE CORRECTION ---
-        # The Cerelog board returns data in Volts. To display it as
-        # microvolts (uV), we must multiply by 1,000,000 (1e6).
-        eeg_plot_data = plot_data[eeg_channels] * 1e6
-        # --- END CORRECTION ---
-        
-        timestamps = plot_data[timestamp_channel]
-        
-        # Correct the timestamp from kiloseconds to seconds
-        relative_time_vector = (timestamps - start_time) * 1000.0
-        
-        # Update each subplot
-        for i, (line, ax) in enumerate(zip(lines, axes)):
-            channel_data = eeg_plot_data[i]
-            
-            centered_data = channel_data - np.mean(channel_data)
-            
-            line.set_data(relative_time_vector, centered_data)
+            # Correct the timestamp from kiloseconds to seconds, re-based on
+            # the newest sample so the data always spans [-SECONDS_TO_DISPLAY, 0]
+            # and the fixed x-limits never have to move
+            relative_time_vector = (timestamps - timestamps[-1]) * 1000.0
+
+            # Update each subplot
+            limits_changed = False
+            for i, (line, ax) in enumerate(zip(lines, axes)):
+                channel_data = eeg_plot_data[i]
 
-            ax.set_xlim(relative_time_vector[0], relative_time_vector[-1])
+                # One fused sweep yields mean and extrema; centering then only
+                # shifts the extrema instead of re-scanning the window twice
+                if _channel_stats_nb is not None:
+                    mean_val, mn, mx = _channel_stats_nb(channel_data)
+                else:
+                    mean_val = float(channel_data.mean())
+                    mn = float(channel_data.min())
+                    mx = float(channel_data.max())
+                # Subtract into the persistent scratch row: centering cannot
+                # run in place (the window may be a view into the ring) but
+                # it no longer allocates a fresh array per channel per frame
+                centered_data = np.subtract(channel_data, np.float32(mean_val),
+                                            out=centered_scratch[i, :channel_data.shape[0]])
 
-            # Adaptive Y-Axis Logic
-            max_val = np.max(centered_data)
-            min_val = np.min(centered_data)
-            if np.isclose(max_val, min_val):
-                max_val += 1; min_val -= 1
+                line.set_data(relative_time_vector, centered_data)
+
+                # Adaptive Y-Axis Logic
+                max_val = mx - mean_val
+                min_val = mn - mean_val
+                if np.isclose(max_val, min_val):
+                    max_val += 1; min_val -= 1
             
-            target_max = max_val * Y_AXIS_PADDING_FACTOR
-            target_min = min_val * Y_AXIS_PADDING_FACTOR
+                target_max = max_val * Y_AXIS_PADDING_FACTOR
+                target_min = min_val * Y_AXIS_PADDING_FACTOR
             
-            current_min, current_max = y_limits[i]
-            smoothing_factor = 0.1
-            new_max = current_max * (1 - smoothing_factor) + target_max * smoothing_factor
-            new_min = current_min * (1 - smoothing_factor) + target_min * smoothing_factor
+                current_min, current_max = y_limits[i]
+                smoothing_factor = 0.1
+                new_max = current_max * (1 - smoothing_factor) + target_max * smoothing_factor
+                new_min = current_min * (1 - smoothing_factor) + target_min * smoothing_factor
             
-            ax.set_ylim(new_min, new_max)
-            y_limits[i] = (new_min, new_max)
+                y_limits[i] = (new_min, new_max)
+
+                # set_ylim forces a transform and tick recompute; skip it while
+                # the smoothed limits sit within 2% of what is on screen
+                applied_min, applied_max = applied_ylim[i]
+                span = abs(applied_max - applied_min) or 1.0
+                if (abs(new_max - applied_max) > 0.02 * span
+                        or abs(new_min - applied_min) > 0.02 * span):
+                    ax.set_ylim(new_min, new_max)
+                    applied_ylim[i] = (new_min, new_max)
+                    limits_changed = True
+
+        if limits_changed:
+            # The cached blit background is stale now; schedule one full
+            # redraw so FuncAnimation re-grabs it, then blitting resumes
+            axes[0].figure.canvas.draw_idle()
 
     except Exception as e:
         print(f"!!! ERROR IN UPDATE_PLOT: {e}")
+    finally:
+        _busy.release()
 
     return lines
 